@@ -0,0 +1,72 @@
+from datetime import date, timedelta
+
+from sqlalchemy import case, func
+
+from models import db, Food
+from stats import get_user_stats
+
+
+def expiry_state_expr(today, expiry_date=Food.expiry_date):
+    """CASE expression classifying an expiry date column relative to today.
+
+    EXPIRED before today, NEAR_EXPIRY 1-3 days out, FRESH otherwise and
+    NULL when the item has no expiry date.
+    """
+    return case(
+        (expiry_date < today, "EXPIRED"),
+        (expiry_date.between(today + timedelta(days=1), today + timedelta(days=3)), "NEAR_EXPIRY"),
+        (expiry_date.isnot(None), "FRESH"),
+    )
+
+
+def days_until(expiry_date, today):
+    return (expiry_date - today).days if expiry_date else None
+
+
+def expiry_counts(user_id, today):
+    """AVAILABLE item counts per expiry state.
+
+    Expiry state moves with the calendar, so unlike the other analytics
+    counters it cannot be kept in the UserStats rollup.
+    """
+    expiry_state = expiry_state_expr(today)
+    rows = (
+        db.session.query(expiry_state, func.count(Food.id))
+        .filter(
+            Food.user_id == user_id,
+            Food.status == "AVAILABLE",
+            Food.expiry_date.isnot(None)
+        )
+        .group_by(expiry_state)
+        .all()
+    )
+    counts = {"fresh": 0, "near_expiry": 0, "expired": 0}
+    for state, count in rows:
+        counts[state.lower()] = count
+    return counts
+
+
+def user_analytics(user_id, today=None):
+    """Build the /api/analytics payload from the UserStats rollup."""
+    today = today or date.today()
+    stats, waste = get_user_stats(user_id)
+
+    return {
+        "summary": {
+            "total_items": stats.total_items,
+            "available": stats.available_count,
+            "used": stats.used_count,
+            "donated": stats.donated_count,
+            "wasted": stats.wasted_count,
+        },
+        "expiry_status": expiry_counts(user_id, today),
+        "quantity_totals": {
+            "available": stats.available_quantity,
+            "used": stats.used_quantity,
+            "donated": stats.donated_quantity,
+            "wasted": stats.wasted_quantity
+        },
+        "waste_by_category": waste["category"],
+        "waste_by_reason": waste["reason"],
+        "total_logs": stats.total_logs
+    }
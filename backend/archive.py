@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, exists, func, insert, literal, select
+
+from models import db, DonationOffer, DonationOfferItem, Food, FoodArchive, Tombstone
+from sync import ENTITY_NAMES, stamp_sync_versions
+
+FINAL_STATUSES = ("USED", "DONATED", "WASTED")
+# Items still listed on these offers stay in the hot table until pickup
+OPEN_OFFER_STATUSES = ("PENDING", "ACCEPTED")
+ARCHIVE_BATCH_SIZE = 1000
+
+ARCHIVED_COLUMNS = [column.name for column in Food.__table__.columns]
+
+
+def archivable(cutoff):
+    """Criteria for Food rows that are final and untouched since `cutoff`."""
+    on_open_offer = exists().where(
+        DonationOfferItem.food_id == Food.id,
+        DonationOffer.id == DonationOfferItem.donation_offer_id,
+        DonationOffer.status.in_(OPEN_OFFER_STATUSES)
+    )
+    return (
+        Food.status.in_(FINAL_STATUSES),
+        func.coalesce(Food.updated_at, Food.created_at) < cutoff,
+        ~on_open_offer
+    )
+
+
+def archive_batch(connection, cutoff, now=None):
+    """Move up to ARCHIVE_BATCH_SIZE archivable Food rows into food_archive.
+
+    Rows keep their ids, so Userlog and DonationOfferItem references still
+    resolve through FoodArchive. Runs as Core statements, which skip the
+    flush hooks: the analytics rollup deliberately keeps counting archived
+    items, and sync clients get a tombstone for each. Returns the number
+    of rows moved.
+    """
+    now = now or datetime.utcnow()
+    rows = connection.execute(
+        select(Food.id, Food.user_id).where(*archivable(cutoff)).order_by(Food.id).limit(ARCHIVE_BATCH_SIZE)
+    ).all()
+    if not rows:
+        return 0
+    food_ids = [food_id for food_id, _ in rows]
+
+    connection.execute(insert(FoodArchive).from_select(
+        ARCHIVED_COLUMNS + ["archived_at"],
+        select(*Food.__table__.columns, literal(now, FoodArchive.archived_at.type)).where(Food.id.in_(food_ids))
+    ))
+    connection.execute(delete(Food).where(Food.id.in_(food_ids)))
+    versions = stamp_sync_versions(connection, {user_id for _, user_id in rows})
+    connection.execute(insert(Tombstone), [
+        {"user_id": user_id, "entity": ENTITY_NAMES[Food], "entity_id": food_id, "deleted_at": now,
+         "sync_version": versions[user_id]}
+        for food_id, user_id in rows
+    ])
+    return len(rows)
+
+
+def archive_foods(older_than_days):
+    """Archive every eligible item, committing after each batch; returns the count."""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    total = 0
+    while True:
+        moved = archive_batch(db.session.connection(), cutoff)
+        db.session.commit()
+        if not moved:
+            return total
+        total += moved
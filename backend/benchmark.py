@@ -0,0 +1,359 @@
+import json
+import platform
+import random
+import subprocess
+import time
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event, func, insert, select
+from werkzeug.security import generate_password_hash
+
+from cache import bump_data_versions, clear_catalog_cache, response_cache
+from expiry import reconcile_alerts
+from models import db, Category, DonationCenter, DonationOffer, DonationOfferItem, Food, User, Userlog
+from search import reindex_centers
+from serializers import FOOD, JSON_PROVIDERS, orjson
+from stats import rebuild_user_stats
+from trends import bucket_cache
+
+CATEGORIES = ["Dairy", "Vegetables", "Fruits", "Bakery", "Meat", "Grains", "Beverages", "Cooked"]
+STORAGE = ["Fridge", "Freezer", "Pantry", "Counter"]
+WASTE_REASONS = ["Expired", "Spoiled", "Overcooked", "Forgot about it"]
+OPEN_HOURS = ["9 AM - 5 PM", "08:00-20:00", "24/7", "10am-6pm", None]
+OFFER_STATUSES = ["PENDING", "ACCEPTED", "REJECTED", "PICKED_UP", "CANCELLED"]
+SEED_EMAIL_DOMAIN = "bench.example.com"
+INSERT_CHUNK_SIZE = 5000
+
+DEFAULT_STATUS_MIX = "AVAILABLE=0.6,USED=0.2,DONATED=0.1,WASTED=0.1"
+DEFAULT_EXPIRY_MIX = "expired=0.1,near=0.15,fresh=0.65,none=0.1"
+
+# (name, path) pairs driven by the benchmark runner, per seeded user
+BENCHMARK_ENDPOINTS = [
+    ("food_list", "/api/food"),
+    ("food_page", "/api/food?bucket=available&limit=50"),
+    ("food_alerts", "/api/food/alerts"),
+    ("food_logs", "/api/food-logs"),
+    ("food_logs_page", "/api/food-logs?limit=50"),
+    ("analytics", "/api/analytics"),
+    ("trends_week", "/api/analytics/trends?granularity=week&split=category"),
+    ("donation_offers", "/api/donation-offers"),
+    ("offer_suggestions", "/api/donation-offers/suggestions?lat=27.7&lon=85.3&radius_km=50"),
+    ("center_search", "/api/donation-centers/search?q=food&accepts=dairy"),
+    ("centers_nearby", "/api/donation-centers/nearby?lat=27.7&lon=85.3&radius_km=25&k=10"),
+]
+
+
+def parse_mix(text):
+    """Parse "A=0.6,B=0.4" into a {name: weight} dict."""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError(f"Invalid distribution: {text}")
+    return mix
+
+
+def _pick(rng, mix):
+    return rng.choices(list(mix), weights=list(mix.values()))[0]
+
+
+def _expiry_date(rng, bucket, today):
+    if bucket == "expired":
+        return today - timedelta(days=rng.randint(1, 30))
+    if bucket == "near":
+        return today + timedelta(days=rng.randint(1, 3))
+    if bucket == "fresh":
+        return today + timedelta(days=rng.randint(4, 60))
+    return None
+
+
+def _insert(model, rows):
+    """Insert rows in chunks; returns their new ids in the order given."""
+    ids = []
+    statement = insert(model).returning(model.id, sort_by_parameter_order=True)
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        ids += db.session.scalars(statement, rows[start:start + INSERT_CHUNK_SIZE]).all()
+    return ids
+
+
+def seed_data(users=50, items_per_user=200, logs_per_item=1.0, centers=50, offers_per_user=5,
+              status_mix=DEFAULT_STATUS_MIX, expiry_mix=DEFAULT_EXPIRY_MIX, seed=42):
+    """Insert a synthetic data set and bring every derived table up to date.
+
+    The same arguments always produce the same rows relative to today.
+    Returns the number of rows inserted per table.
+    """
+    rng = random.Random(seed)
+    statuses = parse_mix(status_mix)
+    expiries = parse_mix(expiry_mix)
+    today = date.today()
+    now = datetime.utcnow()
+    password = generate_password_hash("benchmark")
+    # Seeded emails must not collide with earlier runs
+    run = db.session.scalar(select(func.count(User.id)).where(User.email.like(f"%@{SEED_EMAIL_DOMAIN}")))
+
+    user_ids = _insert(User, [{
+        "name": f"Bench User {run + index}",
+        "email": f"user{run + index}@{SEED_EMAIL_DOMAIN}",
+        "password": password,
+        "created_at": now
+    } for index in range(users)])
+
+    _insert(DonationCenter, [{
+        "name": f"{rng.choice(['Community', 'City', 'Neighbourhood'])} Food Bank {index}",
+        "city": rng.choice(["Kathmandu", "Lalitpur", "Bhaktapur"]),
+        "address": f"Ward {rng.randint(1, 32)}",
+        "accepts_items": ",".join(rng.sample([c.lower() for c in CATEGORIES], rng.randint(0, 3))),
+        "open_hours": rng.choice(OPEN_HOURS),
+        "latitude": 27.7 + rng.uniform(-0.3, 0.3),
+        "longitude": 85.3 + rng.uniform(-0.3, 0.3),
+        "created_at": now
+    } for index in range(centers)])
+    center_ids = db.session.scalars(select(DonationCenter.id)).all()
+
+    _insert(Category, [{"user_id": owner, "name": name} for owner in user_ids for name in CATEGORIES])
+
+    food_rows = []
+    for owner in user_ids:
+        for _ in range(items_per_user):
+            status = _pick(rng, statuses)
+            quantity = round(rng.uniform(0.5, 10), 2)
+            food_rows.append({
+                "user_id": owner,
+                "category": rng.choice(CATEGORIES),
+                "name": f"Item {len(food_rows) + 1}",
+                "quantity": quantity if status == "AVAILABLE" else 0,
+                "unit": rng.choice(["kg", "pcs", "l"]),
+                "purchase_date": today - timedelta(days=rng.randint(0, 90)),
+                "expiry_date": _expiry_date(rng, _pick(rng, expiries), today),
+                "storage_location": rng.choice(STORAGE),
+                "status": status,
+                "reason_of_waste": rng.choice(WASTE_REASONS) if status == "WASTED" else None,
+                "created_at": now - timedelta(days=rng.randint(0, 365))
+            })
+    food_ids = _insert(Food, food_rows)
+
+    log_rows = []
+    available = {owner: [] for owner in user_ids}
+    for food_id, food in zip(food_ids, food_rows):
+        status = food["status"]
+        if status == "AVAILABLE":
+            available[food["user_id"]].append(food_id)
+        for _ in range(int(logs_per_item) + (rng.random() < logs_per_item % 1)):
+            log_rows.append({
+                "user_id": food["user_id"],
+                "food_id": food_id,
+                "action": status if status != "AVAILABLE" else rng.choice(["USED", "DONATED", "WASTED"]),
+                "quantity": round(rng.uniform(0.1, 5), 2),
+                "action_date": today - timedelta(days=rng.randint(0, 365)),
+                "reason": rng.choice(WASTE_REASONS) if status == "WASTED" else None
+            })
+    _insert(Userlog, log_rows)
+
+    offer_rows, offer_foods = [], []
+    for owner in user_ids:
+        if not center_ids or not available[owner]:
+            continue
+        for _ in range(offers_per_user):
+            offer_rows.append({
+                "user_id": owner,
+                "donation_center_id": rng.choice(center_ids),
+                "status": rng.choice(OFFER_STATUSES),
+                "created_at": now - timedelta(days=rng.randint(0, 180))
+            })
+            offer_foods.append(rng.sample(available[owner], min(len(available[owner]), rng.randint(1, 3))))
+    offer_ids = _insert(DonationOffer, offer_rows)
+    item_rows = [
+        {"donation_offer_id": offer_id, "food_id": food_id, "quantity": 1.0}
+        for offer_id, foods in zip(offer_ids, offer_foods) for food_id in foods
+    ]
+    _insert(DonationOfferItem, item_rows)
+
+    # Core INSERTs bypass the flush hooks; rebuild what they would maintain
+    connection = db.session.connection()
+    for owner in user_ids:
+        rebuild_user_stats(connection, owner)
+    bump_data_versions(connection, user_ids)
+    reconcile_alerts(connection, today)
+    db.session.commit()
+    reindex_centers()
+
+    return {
+        "users": len(user_ids),
+        "donation_centers": centers,
+        "categories": len(user_ids) * len(CATEGORIES),
+        "foods": len(food_ids),
+        "food_logs": len(log_rows),
+        "donation_offers": len(offer_ids),
+        "donation_offer_items": len(item_rows)
+    }
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmark(requests_per_endpoint=50, max_users=20, warm=False, endpoints=None, seed=42):
+    """Drive each endpoint through the test client as seeded users.
+
+    Requests rotate over up to max_users seeded users. Unless warm is set,
+    the response cache, cached trend buckets and catalog indexes are
+    cleared before every request so each one does its full work. Returns
+    the report as a dict.
+    """
+    app = current_app._get_current_object()
+    user_ids = db.session.scalars(
+        select(User.id).where(User.email.like(f"%@{SEED_EMAIL_DOMAIN}")).order_by(User.id).limit(max_users)
+    ).all()
+    if not user_ids:
+        raise RuntimeError("No seeded users found; run `flask --app main seed-data` first")
+    tokens = [create_access_token(identity=str(user_id)) for user_id in user_ids]
+    rng = random.Random(seed)
+
+    query_count = [0]
+
+    def count_query(*args):
+        query_count[0] += 1
+
+    selected = [(name, path) for name, path in BENCHMARK_ENDPOINTS if not endpoints or name in endpoints]
+    client = app.test_client()
+    results = {}
+    event.listen(db.engine, "before_cursor_execute", count_query)
+    try:
+        for name, path in selected:
+            latencies, queries, statuses = [], [], {}
+            for _ in range(requests_per_endpoint):
+                headers = {"Authorization": f"Bearer {rng.choice(tokens)}"}
+                if not warm:
+                    response_cache.clear()
+                    bucket_cache.clear()
+                    clear_catalog_cache()
+                query_count[0] = 0
+                start = time.perf_counter()
+                response = client.get(path, headers=headers)
+                response.get_data()
+                latencies.append((time.perf_counter() - start) * 1000)
+                queries.append(query_count[0])
+                statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+            results[name] = {
+                "path": path,
+                "requests": len(latencies),
+                "p50_ms": round(percentile(latencies, 0.50), 3),
+                "p95_ms": round(percentile(latencies, 0.95), 3),
+                "p99_ms": round(percentile(latencies, 0.99), 3),
+                "mean_ms": round(sum(latencies) / len(latencies), 3),
+                "queries_p50": percentile(queries, 0.50),
+                "queries_max": max(queries),
+                "status_codes": statuses
+            }
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count_query)
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "database": db.engine.dialect.name,
+            "warm": warm,
+            "users": len(user_ids),
+            "rows": {
+                "foods": db.session.scalar(select(func.count(Food.id))),
+                "food_logs": db.session.scalar(select(func.count(Userlog.id))),
+                "donation_offers": db.session.scalar(select(func.count(DonationOffer.id))),
+                "donation_centers": db.session.scalar(select(func.count(DonationCenter.id)))
+            }
+        },
+        "endpoints": results
+    }
+
+
+def compare_reports(baseline, current):
+    """Lines describing the p50/p95 and query count change per endpoint."""
+    lines = []
+    for name, result in current["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if before is None:
+            lines.append(f"{name:20} new")
+            continue
+        changes = []
+        for metric in ("p50_ms", "p95_ms"):
+            delta = (result[metric] - before[metric]) / before[metric] * 100 if before[metric] else 0
+            changes.append(f"{metric} {before[metric]:.2f} -> {result[metric]:.2f} ({delta:+.0f}%)")
+        changes.append(f"queries {before['queries_p50']} -> {result['queries_p50']}")
+        lines.append(f"{name:20} " + ", ".join(changes))
+    return lines
+
+
+def load_report(path):
+    with open(path) as report_file:
+        return json.load(report_file)
+
+
+def _best_ms(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return round(min(times), 3)
+
+
+def serialization_benchmark(rows=50000, repeat=5, seed=42):
+    """Time turning a list of food items into a JSON response body.
+
+    Building dicts is timed from ORM instances and from column tuples;
+    encoding is timed with Flask's default provider and each provider in
+    serializers. Needs an app but no database. Returns the best time of
+    `repeat` runs per step, in milliseconds, and the body sizes.
+    """
+    app = current_app._get_current_object()
+    rng = random.Random(seed)
+    today = date.today()
+    now = datetime.utcnow()
+    tuples = [(
+        index,
+        f"Item {index}",
+        rng.choice(CATEGORIES),
+        round(rng.uniform(0.5, 10), 2),
+        rng.choice(["kg", "pcs", "l"]),
+        today - timedelta(days=rng.randint(0, 90)),
+        _expiry_date(rng, _pick(rng, parse_mix(DEFAULT_EXPIRY_MIX)), today),
+        rng.choice(STORAGE),
+        "AVAILABLE",
+        None,
+        now - timedelta(seconds=rng.randint(0, 10 ** 7))
+    ) for index in range(1, rows + 1)]
+    foods = [Food(**FOOD.dump(row)) for row in tuples]
+    items = FOOD.dump_all(tuples)
+
+    timings = {
+        "dump_objects": _best_ms(lambda: [FOOD.dump_object(food) for food in foods], repeat),
+        "dump_tuples": _best_ms(lambda: FOOD.dump_all(tuples), repeat)
+    }
+    providers = {"flask_default": DefaultJSONProvider(app)}
+    providers.update(
+        (name, provider(app)) for name, provider in JSON_PROVIDERS.items()
+        if name != "orjson" or orjson is not None
+    )
+    sizes = {}
+    for name, provider in providers.items():
+        timings[f"encode_{name}"] = _best_ms(lambda: provider.response(items=items).get_data(), repeat)
+        sizes[name] = len(provider.response(items=items).get_data())
+
+    return {"rows": rows, "repeat": repeat, "timings_ms": timings, "bytes": sizes}
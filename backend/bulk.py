@@ -0,0 +1,229 @@
+import codecs
+import csv
+import json
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from cache import bump_data_versions
+from expiry import sync_user_alerts
+from models import db, Food, Userlog
+from stats import StatDelta, apply_deltas
+from stream import inventory_imported
+from sync import stamp_sync_versions
+
+IMPORT_CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD string the same way create_food does."""
+    return datetime.strptime(value, "%Y-%m-%d").date() if value else None
+
+
+def food_row(user_id, data):
+    """Validate one import record and turn it into Food column values.
+
+    Raises ValueError with a user-facing message for invalid records.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Row must be an object")
+
+    name = str(data.get("name") or "").strip()
+    category = str(data.get("category") or "").strip()
+    if not name or not category:
+        raise ValueError("name and category are required")
+
+    try:
+        quantity = float(data.get("quantity"))
+    except (TypeError, ValueError):
+        raise ValueError("quantity must be a number")
+    if quantity < 0:
+        raise ValueError("quantity cannot be negative")
+
+    try:
+        purchase_date = parse_date(data.get("purchase_date"))
+        expiry_date = parse_date(data.get("expiry_date"))
+    except (TypeError, ValueError):
+        raise ValueError("Invalid date format. Use YYYY-MM-DD")
+
+    return {
+        "user_id": user_id,
+        "name": name,
+        "category": category,
+        "quantity": quantity,
+        "unit": data.get("unit") or None,
+        "purchase_date": purchase_date,
+        "expiry_date": expiry_date,
+        "storage_location": data.get("storage_location") or None,
+        "status": "AVAILABLE",
+        "created_at": datetime.utcnow()
+    }
+
+
+def iter_records(stream, fmt):
+    """Yield (row_number, record) pairs from a CSV or NDJSON byte stream.
+
+    The stream is decoded and parsed line by line, so the upload is never
+    held in memory as a whole. Unparseable NDJSON lines yield a ValueError
+    in place of the record.
+    """
+    lines = codecs.iterdecode(stream, "utf-8-sig")
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, record
+        return
+
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError:
+            yield line_number, ValueError("Invalid JSON")
+
+
+def import_foods(user_id, stream, fmt):
+    """Insert every valid record in chunked multi-row INSERTs.
+
+    Returns (inserted_count, error_count, errors) where errors holds at most
+    MAX_REPORTED_ERRORS {"row", "error"} entries. The caller commits.
+    """
+    user_id = int(user_id)
+    inserted = 0
+    error_count = 0
+    errors = []
+    delta = StatDelta()
+    chunk = []
+    sync_version = None
+
+    def flush_chunk():
+        nonlocal sync_version
+        # Stamped before the first INSERT: the version lock is then held
+        # until commit, so writes that commit later get higher versions
+        if sync_version is None:
+            sync_version = stamp_sync_versions(db.session.connection(), [user_id])[user_id]
+        for values in chunk:
+            values["sync_version"] = sync_version
+        db.session.execute(insert(Food).values(chunk))
+        chunk.clear()
+
+    for row_number, record in iter_records(stream, fmt):
+        try:
+            if isinstance(record, ValueError):
+                raise record
+            values = food_row(user_id, record)
+        except ValueError as exc:
+            error_count += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"row": row_number, "error": str(exc)})
+            continue
+
+        chunk.append(values)
+        delta.add_food(values, 1)
+        inserted += 1
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            flush_chunk()
+
+    if chunk:
+        flush_chunk()
+
+    # Core INSERTs bypass the ORM flush hooks, so update the rollup here
+    if inserted:
+        apply_deltas(db.session.connection(), {user_id: delta})
+        bump_data_versions(db.session.connection(), [user_id])
+        sync_user_alerts(db.session, user_id)
+        inventory_imported(db.session, user_id, inserted)
+
+    return inserted, error_count, errors
+
+
+MAX_BATCH_SIZE = 500
+LOG_ACTIONS = ["USED", "DONATED", "WASTED"]
+
+
+def apply_log_batch(user_id, entries, atomic=True):
+    """Apply a list of food log entries with create_food_log's rules.
+
+    All referenced foods are loaded with one IN query and entries are
+    applied in order, so several entries for the same food see each
+    other's quantity changes. In atomic mode any invalid entry leaves the
+    session untouched. Returns (results, applied_count); the caller
+    commits.
+    """
+    food_ids = set()
+    for entry in entries:
+        try:
+            food_ids.add(int(entry.get("food_id")))
+        except (AttributeError, TypeError, ValueError):
+            pass
+    foods = {food.id: food for food in Food.query.filter(Food.id.in_(food_ids))} if food_ids else {}
+
+    # Validate against working quantities first, then mutate
+    remaining = {food_id: food.quantity for food_id, food in foods.items()}
+    results = []
+    planned = []
+    for index, entry in enumerate(entries):
+        error, code, food, action, quantity = _check_entry(user_id, entry, foods, remaining)
+        if error:
+            results.append({"index": index, "food_id": entry.get("food_id") if isinstance(entry, dict) else None,
+                            "status": "error", "code": code, "error": error})
+            continue
+        remaining[food.id] -= quantity
+        planned.append((entry, food, action, quantity))
+        results.append({"index": index, "food_id": food.id, "status": "ok"})
+
+    if atomic and len(planned) != len(entries):
+        return results, 0
+
+    logs = []
+    for entry, food, action, quantity in planned:
+        logs.append(Userlog(
+            user_id=user_id,
+            food_id=food.id,
+            action=action,
+            quantity=quantity,
+            reason=entry.get("reason"),
+            remarks=entry.get("remarks")
+        ))
+        food.quantity -= quantity
+        if food.quantity <= 0:
+            food.status = action
+            food.quantity = 0
+            if action == "WASTED":
+                food.reason_of_waste = entry.get("reason")
+
+    # The unit of work batches these into multi-row INSERTs on flush
+    db.session.add_all(logs)
+    return results, len(planned)
+
+
+def _check_entry(user_id, entry, foods, remaining):
+    """Return (error, code, food, action, quantity) for one batch entry."""
+    if not isinstance(entry, dict):
+        return "Entry must be an object", 400, None, None, None
+
+    food_id = entry.get("food_id")
+    action = str(entry.get("action", "")).upper()
+    quantity = entry.get("quantity")
+
+    if not food_id or not action or not quantity:
+        return "Missing required fields: food_id, action, quantity", 400, None, None, None
+    if action not in LOG_ACTIONS:
+        return "Invalid action. Must be USED, DONATED, or WASTED", 400, None, None, None
+    if isinstance(quantity, bool) or not isinstance(quantity, (int, float)) or quantity <= 0:
+        return "quantity must be a positive number", 400, None, None, None
+
+    try:
+        food = foods.get(int(food_id))
+    except (TypeError, ValueError):
+        food = None
+    if food is None:
+        return f"Food item {food_id} not found", 404, None, None, None
+    if str(food.user_id) != str(user_id):
+        return "Unauthorized access to food item", 403, None, None, None
+    if quantity > remaining[food.id]:
+        return "Quantity exceeds available food quantity", 400, None, None, None
+
+    return None, None, food, action, quantity
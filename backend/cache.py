@@ -0,0 +1,231 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import current_app, make_response, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event, func, insert, inspect, select, update
+
+from models import (
+    db, CatalogVersion, Category, DonationCenter, DonationCenterTag, DonationOffer, Food, Userlog, UserDataVersion
+)
+
+# Writes to these models change what a user's read endpoints return
+VERSIONED_MODELS = (Food, Userlog, Category, DonationOffer)
+# Writes to these models invalidate in-process donation center indexes
+CENTER_MODELS = (DonationCenter, DonationCenterTag)
+
+
+class ResponseCache:
+    """Small thread-safe LRU of rendered response bodies."""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, maxsize):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache()
+
+
+def data_version(user_id):
+    row = db.session.get(UserDataVersion, user_id)
+    return row.version if row else 0
+
+
+def bump_data_versions(connection, user_ids):
+    for user_id in user_ids:
+        result = connection.execute(
+            update(UserDataVersion)
+            .where(UserDataVersion.user_id == user_id)
+            .values(version=UserDataVersion.version + 1)
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(UserDataVersion).values(user_id=user_id, version=1))
+
+
+def history_version(user_id):
+    row = db.session.get(UserDataVersion, user_id)
+    return (row.history_version or 0) if row else 0
+
+
+def bump_history_versions(connection, user_ids):
+    """Invalidate cached closed trend buckets; call after bump_data_versions."""
+    for user_id in user_ids:
+        connection.execute(
+            update(UserDataVersion)
+            .where(UserDataVersion.user_id == user_id)
+            .values(history_version=func.coalesce(UserDataVersion.history_version, 0) + 1)
+        )
+
+
+def _log_day(log, old):
+    """action_date of a Userlog before (old=True) or after this flush, as a date."""
+    value = log.action_date
+    if old:
+        history = inspect(log).attrs.action_date.history
+        if history.deleted:
+            value = history.deleted[0]
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _relabeled_foods(session, dirty):
+    """food_id -> user_id of foods whose deletion or category change moves their logs.
+
+    Trend buckets split by category read the category through the food,
+    so these changes rewrite past buckets without touching a Userlog.
+    """
+    foods = {}
+    for obj in list(session.deleted) + dirty:
+        if not isinstance(obj, Food) or obj.user_id is None or obj.id is None:
+            continue
+        if obj in session.deleted or inspect(obj).attrs.category.history.has_changes():
+            foods[obj.id] = int(obj.user_id)
+    return foods
+
+
+def _users_with_past_logs(connection, foods, today):
+    """User ids among `foods` that have logs of those items dated before today."""
+    if not foods:
+        return set()
+    rows = connection.execute(
+        select(Userlog.user_id)
+        .where(
+            Userlog.user_id.in_(set(foods.values())),
+            Userlog.food_id.in_(list(foods)),
+            Userlog.action_date < today
+        )
+        .distinct()
+    )
+    return {int(user_id) for user_id in rows.scalars()}
+
+
+def catalog_version(name):
+    row = db.session.get(CatalogVersion, name)
+    return row.version if row else 0
+
+
+def bump_catalog_version(connection, name):
+    result = connection.execute(
+        update(CatalogVersion)
+        .where(CatalogVersion.name == name)
+        .values(version=CatalogVersion.version + 1)
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(CatalogVersion).values(name=name, version=1))
+
+
+_catalog_lock = threading.Lock()
+_catalog_cache = {}
+
+
+def cached_catalog(name, key, build):
+    """Return build()'s result, rebuilt only when catalog `name` changes.
+
+    Lets each worker keep derived indexes in memory while staying in step
+    with writes made through other workers.
+    """
+    version = catalog_version(name)
+    with _catalog_lock:
+        entry = _catalog_cache.get(key)
+        if entry is None or entry[0] != version:
+            entry = (version, build())
+            _catalog_cache[key] = entry
+        return entry[1]
+
+
+def clear_catalog_cache():
+    """Drop this worker's derived catalog indexes; they rebuild on next use."""
+    with _catalog_lock:
+        _catalog_cache.clear()
+
+
+@event.listens_for(db.session, "after_flush")
+def _bump_on_flush(session, flush_context):
+    user_ids = set()
+    history_user_ids = set()
+    centers_changed = False
+    dirty = [obj for obj in session.dirty if session.is_modified(obj)]
+    for obj in list(session.new) + list(session.deleted) + dirty:
+        if isinstance(obj, VERSIONED_MODELS) and obj.user_id is not None:
+            user_ids.add(int(obj.user_id))
+        elif isinstance(obj, CENTER_MODELS):
+            centers_changed = True
+
+    # Only logs dated before today can change closed trend buckets
+    today = datetime.utcnow().date()
+    for obj in list(session.new) + list(session.deleted) + dirty:
+        if isinstance(obj, Userlog) and obj.user_id is not None:
+            days = {_log_day(obj, old=True), _log_day(obj, old=False)} - {None}
+            if any(day < today for day in days):
+                history_user_ids.add(int(obj.user_id))
+    history_user_ids |= _users_with_past_logs(session.connection(), _relabeled_foods(session, dirty), today)
+
+    if user_ids:
+        bump_data_versions(session.connection(), user_ids)
+    if history_user_ids:
+        bump_history_versions(session.connection(), history_user_ids)
+    if centers_changed:
+        bump_catalog_version(session.connection(), "donation_centers")
+
+
+def versioned(view):
+    """Conditional GET and response caching for per-user read endpoints.
+
+    The ETag and cache key combine the user's data version, the endpoint,
+    the query string and today's date (expiry states change at midnight).
+    A matching If-None-Match is answered with 304 after a single primary
+    key lookup. Must be applied below @jwt_required().
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method != "GET":
+            return view(*args, **kwargs)
+
+        user_id = int(get_jwt_identity())
+        query_string = urlencode(sorted(request.args.items(multi=True)))
+        key = (user_id, request.endpoint, query_string, data_version(user_id), date.today().isoformat())
+        etag = hashlib.sha1(repr(key).encode()).hexdigest()
+
+        if request.if_none_match.contains(etag):
+            response = make_response("", 304)
+        else:
+            cached = response_cache.get(key)
+            if cached is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                response_cache.set(
+                    key,
+                    (response.get_data(), response.mimetype),
+                    current_app.config["RESPONSE_CACHE_SIZE"]
+                )
+            else:
+                body, mimetype = cached
+                response = current_app.response_class(body, mimetype=mimetype)
+
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "private, no-cache"
+        return response
+
+    return wrapper
@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select, update
+
+from models import db, Food, FoodArchive, Tombstone, Userlog, UserlogDaily
+from serializers import join_food
+from sync import ENTITY_NAMES, stamp_sync_versions
+
+COMPACTION_BATCH_SIZE = 5000
+
+# Frozen when the day is compacted; the item may be archived or deleted later
+LOG_CATEGORY = func.coalesce(Food.category, FoodArchive.category, "Unknown")
+
+
+def _add_daily(connection, key, count, quantity):
+    """Add to a UserlogDaily row, creating it if this is the day's first batch."""
+    user_id, day, action, category = key
+    result = connection.execute(
+        update(UserlogDaily)
+        .where(
+            UserlogDaily.user_id == user_id,
+            UserlogDaily.day == day,
+            UserlogDaily.action == action,
+            UserlogDaily.category == category
+        )
+        .values(count=UserlogDaily.count + count, quantity=UserlogDaily.quantity + quantity)
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(UserlogDaily).values(
+            user_id=user_id, day=day, action=action, category=category, count=count, quantity=quantity
+        ))
+
+
+def compact_batch(connection, cutoff, now=None):
+    """Fold up to COMPACTION_BATCH_SIZE logs dated before `cutoff` into UserlogDaily.
+
+    The raw rows are deleted in the same transaction, so a day's totals are
+    always either in Userlog or in UserlogDaily. Runs as Core statements,
+    which skip the flush hooks: the analytics rollup and cached trend
+    buckets stay valid because no totals change. Sync clients get a
+    tombstone for each log. Returns the number of logs compacted.
+    """
+    now = now or datetime.utcnow()
+    rows = connection.execute(
+        select(Userlog.id, Userlog.user_id)
+        .where(Userlog.action_date < cutoff)
+        .order_by(Userlog.id)
+        .limit(COMPACTION_BATCH_SIZE)
+    ).all()
+    if not rows:
+        return 0
+    log_ids = [log_id for log_id, _ in rows]
+
+    key = [Userlog.user_id, Userlog.action_date, Userlog.action, LOG_CATEGORY]
+    query = select(*key, func.count(Userlog.id), func.coalesce(func.sum(Userlog.quantity), 0)).select_from(Userlog)
+    totals = connection.execute(
+        join_food(query, Userlog.food_id)
+        .where(Userlog.id.in_(log_ids))
+        .group_by(*key)
+    )
+    for user_id, day, action, category, count, quantity in totals:
+        _add_daily(connection, (user_id, day, action, category), count, quantity)
+
+    connection.execute(delete(Userlog).where(Userlog.id.in_(log_ids)))
+    versions = stamp_sync_versions(connection, {user_id for _, user_id in rows})
+    connection.execute(insert(Tombstone), [
+        {"user_id": user_id, "entity": ENTITY_NAMES[Userlog], "entity_id": log_id, "deleted_at": now,
+         "sync_version": versions[user_id]}
+        for log_id, user_id in rows
+    ])
+    return len(rows)
+
+
+def compact_logs(older_than_days):
+    """Compact every log older than `older_than_days`, committing after each batch."""
+    cutoff = datetime.utcnow().date() - timedelta(days=older_than_days)
+    total = 0
+    while True:
+        compacted = compact_batch(db.session.connection(), cutoff)
+        db.session.commit()
+        if not compacted:
+            return total
+        total += compacted
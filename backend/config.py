@@ -3,11 +3,68 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def env_bool(name, default):
+    return os.getenv(name, str(default)).lower() in ("1", "true", "yes")
+
+
+def engine_options(database_uri):
+    """SQLAlchemy engine options for the configured database.
+
+    SQLite needs no pool tuning; its pragmas are applied per connection
+    by database.configure_engine.
+    """
+    if database_uri.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": env_bool("DB_POOL_PRE_PING", True),
+    }
+
+
 class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "super-secret-key")
 
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", "sqlite:///database.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # SQLALCHEMY_ENGINE_OPTIONS defaults to engine_options() of the final
+    # SQLALCHEMY_DATABASE_URI, applied in create_app()
+
+    # Applied on every new SQLite connection. WAL lets readers run alongside
+    # a writer; busy_timeout makes writers wait instead of failing with
+    # "database is locked". cache_size is in KiB when negative.
+    SQLITE_PRAGMAS = {
+        "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+        "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+        "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+        "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-20000")),
+        "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    }
 
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "jwt-secret-key")
     JWT_ACCESS_TOKEN_EXPIRES = 864000  # 10 days
+
+    # Encoder behind jsonify: "orjson", "json" (stdlib) or "auto" to prefer orjson
+    JSON_PROVIDER = os.getenv("JSON_PROVIDER", "auto")
+
+    # `flask archive-food` moves used, donated and wasted items untouched for
+    # this many days into the food_archive table
+    ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+
+    # `flask compact-logs` folds food logs older than this many days into
+    # daily totals and deletes them
+    LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", "365"))
+
+    RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+
+    # Background thread keeping expiry alerts current; when disabled, run
+    # `flask scan-expiry` daily instead
+    EXPIRY_SCANNER_ENABLED = env_bool("EXPIRY_SCANNER_ENABLED", True)
+
+    # Requests slower than this are logged with their costliest queries; 0 disables
+    SLOW_REQUEST_MS = int(os.getenv("SLOW_REQUEST_MS", "500"))
+    # When set, /api/metrics requires "Authorization: Bearer <METRICS_TOKEN>"
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")
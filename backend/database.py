@@ -0,0 +1,19 @@
+from sqlalchemy import event
+
+
+def configure_engine(engine, config):
+    """Apply the configured SQLite pragmas to every new connection."""
+    if engine.dialect.name != "sqlite":
+        return
+    pragmas = config["SQLITE_PRAGMAS"]
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+    # Connections opened before the listener existed miss the pragmas
+    engine.dispose()
+
@@ -0,0 +1,49 @@
+import logging
+import threading
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_subscribers = defaultdict(list)
+# Forwards events to other worker processes when set (see relay.py)
+_relay = None
+
+
+def subscribe(topic, callback):
+    """Call callback(payload) for every event published on topic."""
+    with _lock:
+        _subscribers[topic].append(callback)
+
+
+def unsubscribe(topic, callback):
+    with _lock:
+        if callback in _subscribers[topic]:
+            _subscribers[topic].remove(callback)
+
+
+def set_relay(relay):
+    global _relay
+    _relay = relay
+
+
+def publish(topic, payload):
+    """Deliver an event to the topic's subscribers, and to other workers via the relay."""
+    deliver(topic, payload)
+    if _relay is not None:
+        _relay.send(topic, payload)
+
+
+def deliver(topic, payload):
+    """Deliver an event to the topic's subscribers in this process.
+
+    Subscribers run synchronously; a failing subscriber is logged and does
+    not stop delivery to the others.
+    """
+    with _lock:
+        callbacks = list(_subscribers[topic])
+    for callback in callbacks:
+        try:
+            callback(payload)
+        except Exception:
+            logger.exception("Subscriber for %s failed", topic)
@@ -0,0 +1,372 @@
+import heapq
+import logging
+import threading
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import delete, event, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from cache import bump_data_versions
+from events import publish
+from models import db, ExpiryAlert, Food
+
+logger = logging.getLogger(__name__)
+
+NEAR_EXPIRY_DAYS = 3
+# How far ahead the scanner keeps transitions in memory
+SCAN_WINDOW_DAYS = 7
+
+TRANSITION_TOPIC = "expiry.transition"
+# Heap entry marking the end of the loaded window; food ids start at 1
+WINDOW_END = 0
+
+
+def alert_state(expiry_date, today):
+    """Alert state of an AVAILABLE item, or None when it needs no alert.
+
+    Matches expiry_state_expr: items expiring today are not NEAR_EXPIRY,
+    they get their own EXPIRES_TODAY state.
+    """
+    if expiry_date is None:
+        return None
+    days_left = (expiry_date - today).days
+    if days_left < 0:
+        return "EXPIRED"
+    if days_left == 0:
+        return "EXPIRES_TODAY"
+    if days_left <= NEAR_EXPIRY_DAYS:
+        return "NEAR_EXPIRY"
+    return None
+
+
+def transition_dates(expiry_date):
+    """Dates on which an item's alert state changes."""
+    return (
+        expiry_date - timedelta(days=NEAR_EXPIRY_DAYS),
+        expiry_date,
+        expiry_date + timedelta(days=1)
+    )
+
+
+def _insert_missing(connection):
+    """INSERT that skips rows another worker inserted first."""
+    dialects = {"postgresql": postgresql, "sqlite": sqlite}
+    dialect = dialects.get(connection.dialect.name)
+    if dialect is None:
+        return db.insert(ExpiryAlert)
+    return dialect.insert(ExpiryAlert).on_conflict_do_nothing(index_elements=["food_id"])
+
+
+def sync_alerts(connection, food_ids, today, expiry_dates=None):
+    """Bring the ExpiryAlert rows of the given foods in line with the Food table.
+
+    Updates are conditional on the state actually changing, so several
+    workers syncing the same food only report the transition once.
+    Returns the transitions as event payloads; expiry_dates, when given,
+    is filled with food_id -> expiry_date for the AVAILABLE foods.
+    """
+    food_ids = list(food_ids)
+    if not food_ids:
+        return []
+    foods = {
+        row.id: row for row in connection.execute(
+            select(Food.id, Food.user_id, Food.status, Food.expiry_date).where(Food.id.in_(food_ids))
+        )
+    }
+    alerts = {
+        row.food_id: row for row in connection.execute(
+            select(ExpiryAlert.food_id, ExpiryAlert.user_id, ExpiryAlert.state)
+            .where(ExpiryAlert.food_id.in_(food_ids))
+        )
+    }
+
+    transitions = []
+    for food_id in food_ids:
+        food = foods.get(food_id)
+        state = None
+        if food is not None and food.status == "AVAILABLE":
+            state = alert_state(food.expiry_date, today)
+            if expiry_dates is not None and food.expiry_date is not None:
+                expiry_dates[food_id] = food.expiry_date
+        previous = alerts[food_id].state if food_id in alerts else None
+
+        if state is None:
+            if previous is None:
+                continue
+            result = connection.execute(delete(ExpiryAlert).where(ExpiryAlert.food_id == food_id))
+        elif previous is None:
+            result = connection.execute(
+                _insert_missing(connection).values(
+                    food_id=food_id, user_id=food.user_id, state=state,
+                    expiry_date=food.expiry_date, updated_at=datetime.utcnow()
+                )
+            )
+        else:
+            result = connection.execute(
+                update(ExpiryAlert)
+                .where(ExpiryAlert.food_id == food_id, ExpiryAlert.state == previous)
+                .values(user_id=food.user_id, state=state, expiry_date=food.expiry_date,
+                        updated_at=datetime.utcnow())
+            )
+        if result.rowcount and state != previous:
+            # A deleted food only reaches here through its alert row
+            user_id = food.user_id if food is not None else alerts[food_id].user_id
+            transitions.append({
+                "food_id": food_id,
+                "user_id": int(user_id),
+                "state": state,
+                "previous_state": previous,
+                "expiry_date": food.expiry_date.isoformat() if food is not None and food.expiry_date else None
+            })
+    return transitions
+
+
+def reconcile_alerts(connection, today, user_id=None):
+    """Sync every food that has, or should have, an alert.
+
+    A range scan over (status, expiry_date) plus the alert table itself,
+    so it never reads items that are more than three days from expiry.
+    """
+    due = select(Food.id).where(
+        Food.status == "AVAILABLE",
+        Food.expiry_date <= today + timedelta(days=NEAR_EXPIRY_DAYS)
+    )
+    existing = select(ExpiryAlert.food_id)
+    if user_id is not None:
+        due = due.where(Food.user_id == user_id)
+        existing = existing.where(ExpiryAlert.user_id == user_id)
+    food_ids = set(connection.execute(due).scalars()) | set(connection.execute(existing).scalars())
+    return sync_alerts(connection, sorted(food_ids), today)
+
+
+def bump_alert_versions(connection, transitions):
+    """Retire cached /api/food/alerts responses of the users whose alerts changed.
+
+    The Core writes in sync_alerts skip the cache.py flush hook; callers
+    outside a food write's flush must call this in the same transaction.
+    """
+    bump_data_versions(connection, {transition["user_id"] for transition in transitions})
+
+
+class ExpiryScanner:
+    """Background thread firing expiry transitions from a min-heap.
+
+    The heap holds (transition_date, food_id) entries for the next
+    SCAN_WINDOW_DAYS only; reaching the end of the window loads the next
+    one. The thread sleeps until the earliest entry is due instead of
+    polling, and food writes push new entries as they commit. Entries are
+    only hints: a due food is re-read and synced, so stale entries left
+    behind by edits are harmless.
+    """
+
+    def __init__(self, app, window_days=SCAN_WINDOW_DAYS):
+        self.app = app
+        self.window_days = window_days
+        self.heap = []
+        self.window_end = None
+        self.condition = threading.Condition()
+        self.thread = None
+        self.stopped = False
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="expiry-scanner", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+
+    def push(self, food_id, expiry_date, today):
+        """Queue the food's upcoming transitions that fall inside the window."""
+        if expiry_date is None:
+            return
+        with self.condition:
+            if self.window_end is None:
+                return
+            earliest = self.heap[0][0] if self.heap else None
+            for due in transition_dates(expiry_date):
+                if today < due <= self.window_end:
+                    heapq.heappush(self.heap, (due, food_id))
+            if self.heap and (earliest is None or self.heap[0][0] < earliest):
+                self.condition.notify()
+
+    def push_user(self, user_id, today):
+        """Queue all of a user's transitions inside the window."""
+        if self.window_end is None:
+            return
+        with db.engine.connect() as connection:
+            rows = connection.execute(
+                select(Food.id, Food.expiry_date).where(
+                    Food.user_id == user_id,
+                    Food.status == "AVAILABLE",
+                    Food.expiry_date.between(today, self.window_end + timedelta(days=NEAR_EXPIRY_DAYS))
+                )
+            ).all()
+        for food_id, expiry_date in rows:
+            self.push(food_id, expiry_date, today)
+
+    def load_window(self, connection, today):
+        """Queue all transitions in (today, today + window_days]."""
+        window_end = today + timedelta(days=self.window_days)
+        rows = connection.execute(
+            select(Food.id, Food.expiry_date).where(
+                Food.status == "AVAILABLE",
+                Food.expiry_date.between(today, window_end + timedelta(days=NEAR_EXPIRY_DAYS))
+            )
+        )
+        with self.condition:
+            self.window_end = window_end
+            for food_id, expiry_date in rows:
+                for due in transition_dates(expiry_date):
+                    if today < due <= window_end:
+                        heapq.heappush(self.heap, (due, food_id))
+            # Sentinel: load the next window when this one runs out
+            heapq.heappush(self.heap, (window_end, WINDOW_END))
+
+    def pop_due(self, today):
+        """Remove and return (food_ids, window_ended) for entries due by today."""
+        food_ids = set()
+        window_ended = False
+        with self.condition:
+            while self.heap and self.heap[0][0] <= today:
+                due, food_id = heapq.heappop(self.heap)
+                if food_id == WINDOW_END:
+                    window_ended = True
+                else:
+                    food_ids.add(food_id)
+        return food_ids, window_ended
+
+    def requeue(self, food_ids, window_ended, today):
+        """Put popped entries back, due today, after a failed scan."""
+        with self.condition:
+            for food_id in food_ids:
+                heapq.heappush(self.heap, (today, food_id))
+            if window_ended:
+                heapq.heappush(self.heap, (today, WINDOW_END))
+
+    def scan(self, today):
+        """Fire every transition due by today. Returns the transitions.
+
+        If the transaction fails, the popped entries are requeued so the
+        retry fires them; a duplicate window sentinel only reloads hints.
+        """
+        food_ids, window_ended = self.pop_due(today)
+        try:
+            with db.engine.begin() as connection:
+                transitions = sync_alerts(connection, sorted(food_ids), today)
+                bump_alert_versions(connection, transitions)
+                if window_ended:
+                    self.load_window(connection, today)
+        except Exception:
+            self.requeue(food_ids, window_ended, today)
+            raise
+        publish_transitions(transitions)
+        return transitions
+
+    def start_up(self, today):
+        with db.engine.begin() as connection:
+            transitions = reconcile_alerts(connection, today)
+            bump_alert_versions(connection, transitions)
+            self.load_window(connection, today)
+        publish_transitions(transitions)
+
+    def seconds_until_due(self):
+        if not self.heap:
+            return None
+        wake_at = datetime.combine(self.heap[0][0], time.min)
+        return max((wake_at - datetime.now()).total_seconds(), 0)
+
+    def run(self):
+        with self.app.app_context():
+            try:
+                self.start_up(date.today())
+            except Exception:
+                logger.exception("Expiry scanner failed to start")
+                return
+            while True:
+                with self.condition:
+                    while not self.stopped:
+                        timeout = self.seconds_until_due()
+                        if timeout == 0:
+                            break
+                        self.condition.wait(timeout)
+                    if self.stopped:
+                        return
+                try:
+                    self.scan(date.today())
+                except Exception:
+                    logger.exception("Expiry scan failed")
+                    # Retry in a minute rather than spinning on the same entries
+                    with self.condition:
+                        self.condition.wait(60)
+                finally:
+                    db.session.remove()
+
+
+scanner = None
+
+
+def start_expiry_scanner(app):
+    global scanner
+    if scanner is None:
+        scanner = ExpiryScanner(app)
+        scanner.start()
+    return scanner
+
+
+def publish_transitions(transitions):
+    for transition in transitions:
+        publish(TRANSITION_TOPIC, transition)
+
+
+def _pending(session):
+    return session.info.setdefault("expiry_pending", {"transitions": [], "schedule": {}, "users": set()})
+
+
+@event.listens_for(db.session, "after_flush")
+def _sync_alerts_on_flush(session, flush_context):
+    food_ids = set()
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, Food):
+            food_ids.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, Food) and session.is_modified(obj):
+            food_ids.add(obj.id)
+    if not food_ids:
+        return
+
+    pending = _pending(session)
+    pending["transitions"] += sync_alerts(
+        session.connection(), sorted(food_ids), date.today(), pending["schedule"]
+    )
+
+
+def sync_user_alerts(session, user_id):
+    """Sync a user's alerts after writes that bypass the flush hooks.
+
+    Transitions are published, and the user's items queued on the
+    scanner, once the session commits.
+    """
+    pending = _pending(session)
+    pending["transitions"] += reconcile_alerts(session.connection(), date.today(), user_id)
+    pending["users"].add(user_id)
+
+
+@event.listens_for(db.session, "after_commit")
+def _publish_on_commit(session):
+    pending = session.info.pop("expiry_pending", None)
+    if not pending:
+        return
+    if scanner is not None:
+        today = date.today()
+        for food_id, expiry_date in pending["schedule"].items():
+            scanner.push(food_id, expiry_date, today)
+        for user_id in pending["users"]:
+            scanner.push_user(user_id, today)
+    publish_transitions(pending["transitions"])
+
+
+@event.listens_for(db.session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop("expiry_pending", None)
@@ -0,0 +1,79 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+
+from sqlalchemy import select, union_all
+
+from models import db, Food, FoodArchive, Userlog
+from serializers import FOOD, FOOD_LOG, join_food
+
+EXPORT_FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+# Rows fetched per round trip and written per yielded chunk
+EXPORT_BATCH_SIZE = 1000
+
+
+def export_query(dataset, user_id, include_archived=False):
+    if dataset == "food":
+        query = select(*FOOD.columns).where(Food.user_id == user_id)
+        if not include_archived:
+            return query.order_by(Food.id)
+        archived = select(
+            *(getattr(FoodArchive, column.key) for column in FOOD.columns)
+        ).where(FoodArchive.user_id == user_id)
+        return union_all(query, archived).order_by("id")
+    # Follows the (user_id, action_date, id) index, so no sort is needed
+    return (
+        join_food(select(*FOOD_LOG.columns).select_from(Userlog), Userlog.food_id)
+        .where(Userlog.user_id == user_id)
+        .order_by(Userlog.action_date, Userlog.id)
+    )
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+def iter_rows(query):
+    """Yield result rows in batches over a server-side cursor where supported."""
+    result = db.session.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    yield from result.partitions()
+
+
+def iter_export(query, fmt):
+    """Yield the export as text chunks of up to EXPORT_BATCH_SIZE rows."""
+    columns = [column.name for column in query.selected_columns]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    if writer:
+        writer.writerow(columns)
+
+    for rows in iter_rows(query):
+        for row in rows:
+            if writer:
+                writer.writerow(_plain(value) for value in row)
+            else:
+                buffer.write(json.dumps(dict(zip(columns, map(_plain, row)))))
+                buffer.write("\n")
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def encode_chunks(chunks, compress=False):
+    """Encode text chunks as UTF-8, gzip-compressing them incrementally if asked."""
+    if not compress:
+        for chunk in chunks:
+            yield chunk.encode("utf-8")
+        return
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,92 @@
+import math
+
+from cache import cached_catalog
+from models import db, DonationCenter
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.195
+GRID_CELL_DEGREES = 0.25
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class GeoGrid:
+    """Fixed-size lat/lon grid for k-nearest lookups over points."""
+
+    def __init__(self, points, cell_degrees=GRID_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.cells = {}
+        for point_id, lat, lon in points:
+            self.cells.setdefault(self._cell(lat, lon), []).append((point_id, lat, lon))
+
+    def _cell(self, lat, lon):
+        return math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees)
+
+    def _ring(self, center, ring):
+        row, col = center
+        if ring == 0:
+            yield center
+            return
+        for dc in range(-ring, ring + 1):
+            yield row - ring, col + dc
+            yield row + ring, col + dc
+        for dr in range(-ring + 1, ring):
+            yield row + dr, col - ring
+            yield row + dr, col + ring
+
+    def nearest(self, lat, lon, k, radius_km):
+        """Up to k (point_id, distance_km) pairs within radius_km, nearest first.
+
+        Rings of cells are scanned outward until the closest point any
+        further ring could hold is beyond both the radius and the current
+        k-th distance.
+        """
+        origin = self._cell(lat, lon)
+        max_ring = int(180 / self.cell_degrees)
+        found = []
+        for ring in range(max_ring + 1):
+            # Points in this ring are at least (ring - 1) whole cells away;
+            # longitude degrees are measured at the ring's most poleward edge
+            min_degrees = max(ring - 1, 0) * self.cell_degrees
+            poleward = min(89.0, abs(lat) + (ring + 1) * self.cell_degrees)
+            min_km = 0.99 * min_degrees * KM_PER_DEGREE * math.cos(math.radians(poleward))
+            if min_km > radius_km or (len(found) >= k and min_km > found[k - 1][1]):
+                break
+            for cell in self._ring(origin, ring):
+                for point_id, point_lat, point_lon in self.cells.get(cell, ()):
+                    distance = haversine_km(lat, lon, point_lat, point_lon)
+                    if distance <= radius_km:
+                        found.append((point_id, distance))
+            found.sort(key=lambda pair: pair[1])
+        return found[:k]
+
+
+def center_grid():
+    """Grid of geocoded donation centers, rebuilt when centers change."""
+    def build():
+        points = (
+            db.session.query(DonationCenter.id, DonationCenter.latitude, DonationCenter.longitude)
+            .filter(DonationCenter.latitude.isnot(None), DonationCenter.longitude.isnot(None))
+            .all()
+        )
+        return GeoGrid(points)
+
+    return cached_catalog("donation_centers", "geo_grid", build)
+
+
+def parse_coordinates(latitude, longitude):
+    """Validate a latitude/longitude pair; both may be None."""
+    if latitude is None and longitude is None:
+        return None, None
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        raise ValueError("latitude and longitude must both be numbers")
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError("latitude must be within [-90, 90] and longitude within [-180, 180]")
+    return latitude, longitude
@@ -0,0 +1,61 @@
+import os
+
+from gunicorn.glogging import Logger
+
+wsgi_app = "wsgi:app"
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+# On PostgreSQL, gevent serves many concurrent requests and idle
+# /api/stream connections per worker; post_fork makes psycopg2 cooperative
+# so queries don't block the whole worker, and relay.py forwards live
+# events between workers, so the default is one worker per CPU.
+# SQLite has no such channel, so it keeps a single worker, and uses
+# threads: its busy_timeout waits inside C code, where gevent cannot
+# switch to the greenlet holding the lock. Each open /api/stream holds
+# one of its WEB_THREADS threads.
+postgres = os.getenv("DATABASE_URL", "").startswith("postgres")
+worker_class = os.getenv("WEB_WORKER_CLASS", "gevent" if postgres else "gthread")
+workers = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1) if postgres else "1"))
+threads = int(os.getenv("WEB_THREADS", "4" if postgres else "32"))
+worker_connections = int(os.getenv("WEB_WORKER_CONNECTIONS", "1000"))
+timeout = int(os.getenv("WEB_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+
+# Load the app in each worker after fork, so gevent patching happens first
+# and no database connection or thread is inherited across the fork
+preload_app = False
+accesslog = "-"
+
+
+class AccessLogger(Logger):
+    """Access log that leaves out the query string of /api/stream.
+
+    EventSource cannot send headers, so stream requests carry the access
+    token as ?jwt=, which must not end up in the logs.
+    """
+
+    def atoms(self, resp, req, environ, request_time):
+        atoms = super().atoms(resp, req, environ, request_time)
+        if environ.get("PATH_INFO") == "/api/stream":
+            atoms["r"] = f"{atoms['m']} {atoms['U']} {atoms['H']}"
+            atoms["q"] = ""
+            atoms["{query_string}e"] = ""
+            atoms["{raw_uri}e"] = atoms["U"]
+        return atoms
+
+
+logger_class = AccessLogger
+
+
+def post_fork(server, worker):
+    if worker_class == "gevent":
+        from psycogreen.gevent import patch_psycopg
+
+        patch_psycopg()
+
+
+def post_worker_init(worker):
+    from main import start_background_tasks
+
+    start_background_tasks(worker.wsgi)
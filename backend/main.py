@@ -1,6 +1,13 @@
-from flask import Flask, request, jsonify
+import base64
+import csv
+import json
+
+import click
+from flask import Blueprint, Flask, Response, abort, current_app, request, jsonify, stream_with_context
 from flask_cors import CORS
 from datetime import datetime, date, timedelta
+from sqlalchemy import and_, case, func, or_
+from sqlalchemy.orm import joinedload
 from flask_jwt_extended import (
     JWTManager,
     create_access_token,
@@ -9,22 +16,77 @@ from flask_jwt_extended import (
 )
 from werkzeug.security import generate_password_hash, check_password_hash
 
-from config import Config
-from models import db, User, Food, Category, Userlog, DonationCenter, DonationOffer, DonationOfferItem
+from analytics import days_until, expiry_state_expr, user_analytics
+from archive import archive_foods
+from benchmark import (
+    DEFAULT_EXPIRY_MIX, DEFAULT_STATUS_MIX, compare_reports, load_report, run_benchmark, seed_data,
+    serialization_benchmark
+)
+from bulk import MAX_BATCH_SIZE, apply_log_batch, import_foods
+from cache import bump_data_versions, versioned
+from compaction import compact_logs
+from config import Config, engine_options
+from database import configure_engine
+from export import EXPORT_FORMATS, encode_chunks, export_query, iter_export
+from expiry import bump_alert_versions, publish_transitions, reconcile_alerts, start_expiry_scanner
+from geo import center_grid, parse_coordinates
+from matching import suggest_offers
+from metrics import init_metrics, metrics
+from models import db, User, Food, FoodArchive, Category, Userlog, DonationCenter, DonationOffer, DonationOfferItem, ExpiryAlert
+from schema import init_schema
+from relay import start_event_relay
+from search import parse_tags, reindex_centers, search_centers, search_terms, set_center_tags
+from serializers import (
+    CATEGORY, DONATION_CENTER, DONATION_CENTER_DETAIL, DONATION_OFFER, FOOD, FOOD_ALERT, FOOD_COMPUTED, FOOD_ITEM,
+    FOOD_LOG, join_food, json_provider, offer_items, parse_fields, trim
+)
+from stats import rebuild_all_stats, rebuild_user_stats
+from stream import event_stream
+from sync import changes_since, decode_sync_cursor, prune_tombstones
+from trends import GRANULARITIES, MAX_PERIODS, waste_trends
 
 # ---------------- APP SETUP ----------------
-app = Flask(__name__)
-app.config.from_object(Config)
-CORS(app)  # Enable CORS for all routes
+api = Blueprint("api", __name__, cli_group=None)
+jwt = JWTManager()
+
+
+def create_app(config=Config):
+    """Build the Flask app.
+
+    Opens no database connections, so servers can call it before forking
+    their workers. Create the schema with `flask --app main init-db`.
+    """
+    app = Flask(__name__)
+    app.config.from_object(config)
+    # Derived from the final URI, so a config overriding it gets matching pool options
+    if "SQLALCHEMY_ENGINE_OPTIONS" not in app.config:
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config["SQLALCHEMY_DATABASE_URI"])
+    app.json = json_provider(app)
+    CORS(app)  # Enable CORS for all routes
 
-db.init_app(app)
-jwt = JWTManager(app)
+    db.init_app(app)
+    jwt.init_app(app)
+    with app.app_context():
+        configure_engine(db.engine, app.config)
 
-# ---------------- CREATE DATABASE ----------------
-with app.app_context():
-    db.create_all()
+    init_metrics(app)
+    app.register_blueprint(api)
+    return app
+
+
+def start_background_tasks(app):
+    """Start per-process background threads; call once in each worker."""
+    with app.app_context():
+        start_event_relay(db.engine)
+    if app.config["EXPIRY_SCANNER_ENABLED"]:
+        start_expiry_scanner(app)
+
+
+def init_db():
+    """Create or upgrade the schema and the default user (id=1)."""
+    init_schema()
     # Create default user for evaluation (no auth)
-    if not User.query.get(1):
+    if not db.session.get(User, 1):
         default_user = User(
             id=1,
             name="Test User",
@@ -36,8 +98,130 @@ with app.app_context():
         db.session.commit()
         print("✅ Default user created for evaluation")
 
+# ---------------- CLI ----------------
+@api.cli.command("init-db")
+def init_db_command():
+    """Create tables and indexes, upgrade existing ones and seed the default user."""
+    init_db()
+    click.echo("Database initialized")
+
+@api.cli.command("rebuild-stats")
+@click.option("--user-id", type=int, help="Only rebuild this user's rollup.")
+def rebuild_stats_command(user_id):
+    """Recompute the UserStats analytics rollup from food items and logs."""
+    connection = db.session.connection()
+    if user_id:
+        rebuild_user_stats(connection, user_id)
+        user_ids = [user_id]
+    else:
+        user_ids = rebuild_all_stats(connection)
+    # Invalidate cached analytics responses built from the old rollup
+    bump_data_versions(connection, user_ids)
+    db.session.commit()
+    count = len(user_ids)
+    click.echo(f"Rebuilt analytics rollup for {count} user(s)")
+
+@api.cli.command("reindex-centers")
+def reindex_centers_command():
+    """Rebuild donation center tags and the full-text search index."""
+    reindex_centers()
+    click.echo("Donation center search index rebuilt")
+
+@api.cli.command("scan-expiry")
+def scan_expiry_command():
+    """Bring expiry alerts up to date, for deployments without the scanner thread."""
+    connection = db.session.connection()
+    transitions = reconcile_alerts(connection, date.today())
+    bump_alert_versions(connection, transitions)
+    db.session.commit()
+    publish_transitions(transitions)
+    click.echo(f"Updated {len(transitions)} expiry alert(s)")
+
+@api.cli.command("prune-tombstones")
+def prune_tombstones_command():
+    """Delete sync tombstones older than the retention window."""
+    count = prune_tombstones(db.session.connection())
+    db.session.commit()
+    click.echo(f"Pruned {count} tombstone(s)")
+
+@api.cli.command("archive-food")
+@click.option("--older-than-days", type=int, help="Defaults to ARCHIVE_AFTER_DAYS.")
+def archive_food_command(older_than_days):
+    """Move finished food items untouched for a while into the archive table."""
+    if older_than_days is None:
+        older_than_days = current_app.config["ARCHIVE_AFTER_DAYS"]
+    count = archive_foods(older_than_days)
+    click.echo(f"Archived {count} food item(s)")
+
+@api.cli.command("compact-logs")
+@click.option("--older-than-days", type=int, help="Defaults to LOG_RETENTION_DAYS.")
+def compact_logs_command(older_than_days):
+    """Fold old food logs into daily totals and delete the raw rows."""
+    if older_than_days is None:
+        older_than_days = current_app.config["LOG_RETENTION_DAYS"]
+    count = compact_logs(older_than_days)
+    click.echo(f"Compacted {count} food log(s)")
+
+@api.cli.command("seed-data")
+@click.option("--users", default=50, show_default=True, help="Users to create.")
+@click.option("--items-per-user", default=200, show_default=True, help="Food items per user.")
+@click.option("--logs-per-item", default=1.0, show_default=True, help="Average food logs per item.")
+@click.option("--centers", default=50, show_default=True, help="Donation centers to create.")
+@click.option("--offers-per-user", default=5, show_default=True, help="Donation offers per user.")
+@click.option("--status-mix", default=DEFAULT_STATUS_MIX, show_default=True, help="Food status weights.")
+@click.option("--expiry-mix", default=DEFAULT_EXPIRY_MIX, show_default=True,
+              help="Expiry weights over expired, near (1-3 days), fresh and none.")
+@click.option("--seed", default=42, show_default=True, help="Random seed, for reproducible data.")
+def seed_data_command(**shape):
+    """Fill the database with synthetic users, food, logs, centers and offers."""
+    try:
+        counts = seed_data(**shape)
+    except ValueError as exc:
+        raise click.BadParameter(str(exc))
+    click.echo(", ".join(f"{count} {table}" for table, count in counts.items()))
+
+@api.cli.command("benchmark")
+@click.option("--requests", "requests_per_endpoint", default=50, show_default=True,
+              help="Requests per endpoint.")
+@click.option("--users", "max_users", default=20, show_default=True, help="Seeded users to rotate over.")
+@click.option("--warm", is_flag=True, help="Keep the response, trend and catalog caches between requests.")
+@click.option("--endpoint", "endpoints", multiple=True, help="Only run these endpoints (repeatable).")
+@click.option("--output", type=click.Path(dir_okay=False), help="Write the JSON report here.")
+@click.option("--compare", type=click.Path(exists=True, dir_okay=False), help="Report to compare against.")
+def benchmark_command(requests_per_endpoint, max_users, warm, endpoints, output, compare):
+    """Measure latency percentiles and query counts of the main read endpoints."""
+    try:
+        report = run_benchmark(requests_per_endpoint, max_users, warm, endpoints)
+    except RuntimeError as exc:
+        raise click.ClickException(str(exc))
+
+    for name, result in report["endpoints"].items():
+        click.echo(
+            f"{name:20} p50 {result['p50_ms']:8.2f} ms  p95 {result['p95_ms']:8.2f} ms  "
+            f"p99 {result['p99_ms']:8.2f} ms  queries {result['queries_p50']}"
+        )
+    if compare:
+        click.echo(f"\nCompared with {compare}:")
+        for line in compare_reports(load_report(compare), report):
+            click.echo(line)
+    if output:
+        with open(output, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+        click.echo(f"Report written to {output}")
+
+@api.cli.command("benchmark-serialization")
+@click.option("--rows", default=50000, show_default=True, help="Food items in the serialized list.")
+@click.option("--repeat", default=5, show_default=True, help="Runs per step; the best is reported.")
+def benchmark_serialization_command(rows, repeat):
+    """Time building and JSON-encoding a large food list, per JSON provider."""
+    report = serialization_benchmark(rows, repeat)
+    for step, milliseconds in report["timings_ms"].items():
+        click.echo(f"{step:22} {milliseconds:9.2f} ms")
+    for name, size in report["bytes"].items():
+        click.echo(f"{name:22} {size:9d} bytes")
+
 # ---------------- REGISTER ----------------
-@app.route("/api/auth/register", methods=["POST"])
+@api.route("/api/auth/register", methods=["POST"])
 def register():
     data = request.get_json()
 
@@ -70,7 +254,7 @@ def register():
     return jsonify({"message": "User registered successfully"}), 201
 
 # ---------------- LOGIN ----------------
-@app.route("/api/auth/login", methods=["POST"])
+@api.route("/api/auth/login", methods=["POST"])
 def login():
     data = request.get_json()
 
@@ -97,8 +281,9 @@ def login():
         }
     })
 
-@app.route("/api/category", methods = ["POST", "GET"])
+@api.route("/api/category", methods = ["POST", "GET"])
 @jwt_required()
+@versioned
 def category ():
     user_id = get_jwt_identity()
     if request.method == "POST":
@@ -114,20 +299,14 @@ def category ():
         db.session.commit()
         return jsonify({"message": "Category Added Successfully"}), 201
     else:
-        data = Category.query.filter_by( user_id = user_id)
-        category = []
-        for d in data :
-           category_items =  {
-               "id": d.id,
-               "name": d.name,
-           }
-           category.append(category_items)
+        rows = db.session.query(*CATEGORY.columns).filter(Category.user_id == user_id)
+        category = CATEGORY.dump_all(rows)
         return jsonify(
             {
                 "category": category
             }
         )
-@app.route("/api/category/<int:id>", methods = ["DELETE"])
+@api.route("/api/category/<int:id>", methods = ["DELETE"])
 @jwt_required()
 def delete_category(id):
     data = Category.query.get_or_404(id)
@@ -137,7 +316,7 @@ def delete_category(id):
 
 #------- Food System----------------
 #------- Add Food Items------------
-@app.route("/api/food", methods = ["POST"])
+@api.route("/api/food", methods = ["POST"])
 @jwt_required()
 def create_food():
     user_id = get_jwt_identity()
@@ -161,29 +340,246 @@ def create_food():
 
     return jsonify({"message": "Succesfully added food items"}), 201
 
+#------- Bulk Import Food Items------------
+IMPORT_FORMATS = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
 
-def get_expiry_info(food_item):
-    if not food_item.expiry_date:
-        return None, None
-    
+@api.route("/api/food/import", methods=["POST"])
+@jwt_required()
+def import_food():
+    user_id = get_jwt_identity()
+
+    fmt = request.args.get("format") or IMPORT_FORMATS.get(request.mimetype)
+    if fmt not in ("csv", "ndjson"):
+        return jsonify({"error": "Unsupported format. Send text/csv or application/x-ndjson, or pass ?format=csv|ndjson"}), 400
+
+    try:
+        inserted, error_count, errors = import_foods(user_id, request.stream, fmt)
+    except UnicodeDecodeError:
+        db.session.rollback()
+        return jsonify({"error": "Upload must be UTF-8 encoded"}), 400
+    except csv.Error as exc:
+        db.session.rollback()
+        return jsonify({"error": f"Malformed CSV: {exc}"}), 400
+
+    db.session.commit()
+
+    return jsonify({
+        "message": f"Imported {inserted} food items",
+        "inserted": inserted,
+        "error_count": error_count,
+        "errors": errors
+    }), 201 if inserted else 400
+
+
+#----- Inventory buckets & keyset cursors ----
+FOOD_BUCKETS = ["available", "expired", "used", "donated", "wasted"]
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def food_bucket_expr(today, model=Food):
+    """SQL expression that assigns each Food (or FoodArchive) row to its inventory bucket."""
+    return case(
+        (and_(model.status == "AVAILABLE", model.expiry_date < today), "expired"),
+        (model.status == "AVAILABLE", "available"),
+        else_=func.lower(model.status)
+    )
+
+
+def food_bucket_filter(bucket, today, model=Food):
+    if bucket == "expired":
+        return and_(model.status == "AVAILABLE", model.expiry_date < today)
+    if bucket == "available":
+        return and_(
+            model.status == "AVAILABLE",
+            or_(model.expiry_date.is_(None), model.expiry_date >= today)
+        )
+    return model.status == bucket.upper()
+
+
+def archive_requested():
+    """Whether the `include_archived` parameter asks for archived items too."""
+    return request.args.get("include_archived", "").lower() in ("1", "true", "yes")
+
+
+def food_query(schema, today, criteria, include_archived=False):
+    """(*schema.columns, expiry_state) rows of Food, plus FoodArchive if asked.
+
+    `criteria(model)` returns the filters for either table; each branch is
+    filtered before the union, so ORDER BY may only use selected Food columns.
+    """
+    def branch(model):
+        columns = [getattr(model, column.key) for column in schema.columns]
+        return (
+            db.session.query(*columns, expiry_state_expr(today, model.expiry_date))
+            .filter(*criteria(model))
+        )
+
+    query = branch(Food)
+    if include_archived:
+        query = query.union_all(branch(FoodArchive))
+    return query
+
+
+def encode_cursor(sort_value, row_id):
+    """Opaque page cursor for a (date, id) keyset position."""
+    raw = json.dumps([sort_value.isoformat() if sort_value else None, row_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, parse=date.fromisoformat):
+    """Inverse of encode_cursor; raises ValueError on a malformed cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return (parse(sort_value) if sort_value else None), int(row_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def keyset_after(column, id_column, cursor):
+    """Rows strictly after the cursor in (column ASC NULLS LAST, id ASC) order."""
+    sort_value, row_id = cursor
+    if sort_value is None:
+        return and_(column.is_(None), id_column > row_id)
+    return or_(
+        column > sort_value,
+        and_(column == sort_value, id_column > row_id),
+        column.is_(None)
+    )
+
+
+def keyset_before(column, id_column, cursor):
+    """Rows strictly after the cursor in (column DESC, id DESC) order."""
+    sort_value, row_id = cursor
+    return or_(
+        column < sort_value,
+        and_(column == sort_value, id_column < row_id)
+    )
+
+
+def parse_page_size(value):
+    try:
+        limit = int(value) if value else DEFAULT_PAGE_SIZE
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def count_requested(cursor):
+    """Whether to compute total_count: on the first page, or later ones with count=1."""
+    return cursor is None or request.args.get("count", "").lower() in ("1", "true", "yes")
+
+
+def food_bucket_counts(user_id, today, include_archived=False):
+    counts = {name: 0 for name in FOOD_BUCKETS}
+    for model in (Food, FoodArchive) if include_archived else (Food,):
+        bucket = food_bucket_expr(today, model)
+        rows = (
+            db.session.query(bucket, func.count(model.id))
+            .filter(model.user_id == user_id)
+            .group_by(bucket)
+            .all()
+        )
+        for name, count in rows:
+            if name in counts:
+                counts[name] += count
+    return counts
+
+
+def food_data(schema, rows, today):
+    """Dicts for (*schema.columns, expiry_state) rows, with days_left added."""
+    items = []
+    for row in rows:
+        item = schema.dump(row)
+        item["expiry_state"] = row[-1]
+        item["days_left"] = days_until(item["expiry_date"], today)
+        items.append(item)
+    return items
+
+
+def requested_fields(names):
+    """The `fields` query parameter checked against `names`; None when absent."""
+    return parse_fields(request.args.get("fields"), names)
+
+
+def food_page(user_id, bucket, fields):
+    """Keyset-paginated listing of a single inventory bucket."""
     today = date.today()
-    days_left = (food_item.expiry_date - today).days
+    try:
+        limit = parse_page_size(request.args.get("limit"))
+        cursor = request.args.get("cursor")
+        cursor = decode_cursor(cursor) if cursor else None
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    include_archived = archive_requested()
+    schema = FOOD_ITEM.sparse(fields, required=("id", "expiry_date"))
+
+    def criteria(model):
+        where = [model.user_id == user_id, food_bucket_filter(bucket, today, model)]
+        if cursor:
+            where.append(keyset_after(model.expiry_date, model.id, cursor))
+        return where
+
+    query = food_query(schema, today, criteria, include_archived)
+    rows = (
+        query.order_by(Food.expiry_date.asc().nulls_last(), Food.id.asc())
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
 
-    if days_left < 0:
-        state = "EXPIRED"
-    elif 1<= days_left <=3:
-        state = "NEAR_EXPIRY"
-    else:
-        state = "FRESH"
+    items = food_data(schema, rows, today)
+
+    last_item = items[-1] if items else None
+    next_cursor = encode_cursor(last_item["expiry_date"], last_item["id"]) if has_more else None
 
-    return state, days_left 
+    # The per-bucket GROUP BY reads the whole inventory, so only once per listing
+    counts = food_bucket_counts(user_id, today, include_archived) if count_requested(cursor) else None
+
+    return jsonify({
+        "bucket": bucket,
+        "items": trim(items, fields),
+        "counts": counts,
+        "limit": limit,
+        "next_cursor": next_cursor
+    })
 
 #----- List food items ----
-@app.route("/api/food", methods=["GET"])
+@api.route("/api/food", methods=["GET"])
 @jwt_required()
+@versioned
 def food_list():
     user_id = get_jwt_identity()
-    items = Food.query.filter_by(user_id = user_id).all()
+    try:
+        fields = requested_fields(FOOD_ITEM.names + FOOD_COMPUTED)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    # Paginated mode: one bucket per request, filtered and ordered in SQL
+    bucket = request.args.get("bucket")
+    if bucket:
+        bucket = bucket.lower()
+        if bucket not in FOOD_BUCKETS:
+            return jsonify({"error": f"Invalid bucket. Must be one of: {', '.join(FOOD_BUCKETS)}"}), 400
+        return food_page(user_id, bucket, fields)
+
+    # Legacy mode: every bucket in one response (used by the current frontend)
+    today = date.today()
+    schema = FOOD_ITEM.sparse(fields, required=("id", "status", "expiry_date"))
+    rows = (
+        food_query(schema, today, lambda model: [model.user_id == user_id], archive_requested())
+        .order_by(Food.id)
+        .all()
+    )
 
     available_items = []
     expired_items = []
@@ -191,28 +587,17 @@ def food_list():
     donated_items = []
     wasted_items = []
 
-    for item in items:
-        expiry_state, days_left = get_expiry_info(item)
-        item_data = {
-            "id": item.id,
-            "name": item.name,
-            "category": item.category,
-            "quantity": item.quantity,
-            "unit": item.unit,
-            "expiry_date": item.expiry_date,
-            "status": item.status,
-            "expiry_state": expiry_state,
-            "days_left": days_left
-        }
-        if item.status == "AVAILABLE" and expiry_state == "EXPIRED":
+    for item_data in food_data(schema, rows, today):
+        status = item_data["status"]
+        if status == "AVAILABLE" and item_data["expiry_state"] == "EXPIRED":
             expired_items.append(item_data)
-        elif item.status == "AVAILABLE":
+        elif status == "AVAILABLE":
             available_items.append(item_data)
-        elif item.status == "USED":
+        elif status == "USED":
             used_items.append(item_data)
-        elif item.status == "DONATED":
+        elif status == "DONATED":
             donated_items.append(item_data)
-        elif item.status == "WASTED":
+        elif status == "WASTED":
             wasted_items.append(item_data)
     expired_items.sort(key=lambda x: x["days_left"])  # most negative first
     available_items.sort(
@@ -225,46 +610,41 @@ def food_list():
     return jsonify({
         "expired_count": len(expired_items),
         "available_count": len(available_items),
-        "expired_items": expired_items,
-        "available_items": available_items,
+        "expired_items": trim(expired_items, fields),
+        "available_items": trim(available_items, fields),
         "used_items": len(used_items),
         "donated_items": len(donated_items),
         "wasted_items": len(wasted_items),
-        "used_items": used_items,
-        "donated_items": donated_items,
-        "wasted_items": wasted_items
+        "used_items": trim(used_items, fields),
+        "donated_items": trim(donated_items, fields),
+        "wasted_items": trim(wasted_items, fields)
     })
 
     
 
-@app.route("/api/food/alerts", methods=["GET"])
+@api.route("/api/food/alerts", methods=["GET"])
 @jwt_required()
+@versioned
 def expiry_alerts():
     user_id = get_jwt_identity()
-    items = Food.query.filter_by(user_id = user_id, status = "AVAILABLE").all()
-    alerts = []
-    expired_count = 0
-    near_expiry_count = 0
+    today = date.today()
 
-    for item in items:
-        expiry_state, days_left = get_expiry_info(item)
-
-        if expiry_state == "EXPIRED":
-            expired_count += 1
-        elif expiry_state == "NEAR_EXPIRY":
-            near_expiry_count += 1
-
-        if expiry_state in ["EXPIRED", "NEAR_EXPIRY"]:
-            alerts.append({
-                "id": item.id,
-                "name": item.name,
-                "category": item.category,
-                "expiry_date": item.expiry_date,
-                "expiry_state": expiry_state,
-                "days_left": days_left
-            })
-    
-    alerts.sort(key=lambda x: x["days_left"])
+    # Alerts are kept current by the expiry scanner; the state is still
+    # derived from the stored date so a lagging scanner never mislabels one.
+    # Items expiring today are FRESH here.
+    rows = (
+        db.session.query(*FOOD_ALERT.columns, expiry_state_expr(today))
+        .join(ExpiryAlert, ExpiryAlert.food_id == Food.id)
+        .filter(
+            ExpiryAlert.user_id == user_id,
+            ExpiryAlert.expiry_date != today
+        )
+        .order_by(ExpiryAlert.expiry_date.asc(), ExpiryAlert.food_id.asc())
+        .all()
+    )
+    alerts = food_data(FOOD_ALERT, rows, today)
+    expired_count = sum(1 for alert in alerts if alert["expiry_state"] == "EXPIRED")
+    near_expiry_count = sum(1 for alert in alerts if alert["expiry_state"] == "NEAR_EXPIRY")
 
     return jsonify({
         "expired_count": expired_count,
@@ -274,7 +654,7 @@ def expiry_alerts():
     })
 
 #------Update Food-------------
-@app.route("/api/food/<int:id>", methods = ["PUT"])
+@api.route("/api/food/<int:id>", methods = ["PUT"])
 @jwt_required()
 def update_food(id):
     user_id = get_jwt_identity()
@@ -291,7 +671,7 @@ def update_food(id):
     return jsonify({"message": "Food item successfully updated"})
 
 #-------------Delete Food----------
-@app.route("/api/food/<int:id>", methods = ["DELETE"])
+@api.route("/api/food/<int:id>", methods = ["DELETE"])
 @jwt_required()
 def delete_food(id):
     user_id = get_jwt_identity()
@@ -303,7 +683,7 @@ def delete_food(id):
     return jsonify({"message": "Food item is successfully deleted"})
 
 #------------Update Status--------------
-@app.route("/api/food/<int:id>/status", methods=["PATCH"])
+@api.route("/api/food/<int:id>/status", methods=["PATCH"])
 @jwt_required()
 def change_status(id):
     user_id = get_jwt_identity()
@@ -320,7 +700,7 @@ def change_status(id):
 
 
 # ---------------- GET PROFILE ----------------
-@app.route("/api/users/me", methods=["GET"])
+@api.route("/api/users/me", methods=["GET"])
 @jwt_required()
 def get_profile():
     user_id = get_jwt_identity()
@@ -335,7 +715,7 @@ def get_profile():
     })
 
 # ---------------- UPDATE PROFILE ----------------
-@app.route("/api/users/me", methods=["PUT"])
+@api.route("/api/users/me", methods=["PUT"])
 @jwt_required()
 def update_profile():
     user_id = get_jwt_identity()
@@ -351,7 +731,7 @@ def update_profile():
     return jsonify({"message": "Profile updated successfully"})
 
 # ---------------- DELETE PROFILE ----------------
-@app.route("/api/users/me", methods=["DELETE"])
+@api.route("/api/users/me", methods=["DELETE"])
 @jwt_required()
 def delete_profile():
     user_id = get_jwt_identity()
@@ -364,7 +744,7 @@ def delete_profile():
 
 # ---------------- FOOD LOGS CRUD ----------------
 # ------- Create Food Log -------
-@app.route("/api/food-logs", methods=["POST"])
+@api.route("/api/food-logs", methods=["POST"])
 @jwt_required()
 def create_food_log():
     user_id = get_jwt_identity()
@@ -414,9 +794,58 @@ def create_food_log():
 
     return jsonify({"message": "Food log created successfully"}), 201
 
+# ------- Batch Create Food Logs -------
+@api.route("/api/food-logs/batch", methods=["POST"])
+@jwt_required()
+def create_food_logs_batch():
+    user_id = get_jwt_identity()
+    data = request.get_json()
+
+    if not data:
+        return jsonify({"error": "JSON body required"}), 400
+
+    entries = data.get("entries")
+    if not isinstance(entries, list) or not entries:
+        return jsonify({"error": "entries must be a non-empty list"}), 400
+    if len(entries) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"At most {MAX_BATCH_SIZE} entries per batch"}), 400
+
+    mode = str(data.get("mode", "atomic")).lower()
+    if mode not in ["atomic", "partial"]:
+        return jsonify({"error": "Invalid mode. Must be atomic or partial"}), 400
+
+    results, applied = apply_log_batch(user_id, entries, atomic=(mode == "atomic"))
+    failed = sum(1 for result in results if result["status"] == "error")
+
+    if mode == "atomic" and failed:
+        db.session.rollback()
+        return jsonify({
+            "error": "Batch rejected; no changes were applied",
+            "applied": 0,
+            "failed": failed,
+            "results": results
+        }), 400
+
+    db.session.commit()
+
+    return jsonify({
+        "message": f"{applied} food logs created",
+        "applied": applied,
+        "failed": failed,
+        "results": results
+    }), 201 if applied else 400
+
+def food_log_query(*columns, schema=FOOD_LOG):
+    """Rows of `schema`, after any extra columns; joins the food only for food_name."""
+    query = db.session.query(*columns, *schema.columns).select_from(Userlog)
+    if "food_name" in schema.names:
+        query = join_food(query, Userlog.food_id)
+    return query
+
 # ------- List Food Logs -------
-@app.route("/api/food-logs", methods=["GET"])
+@api.route("/api/food-logs", methods=["GET"])
 @jwt_required()
+@versioned
 def list_food_logs():
     user_id = get_jwt_identity()
     
@@ -424,57 +853,82 @@ def list_food_logs():
     action_filter = request.args.get("action")
     food_id_filter = request.args.get("food_id")
 
-    query = Userlog.query.filter_by(user_id=user_id)
-
+    try:
+        start_date = request.args.get("start_date")
+        start_date = date.fromisoformat(start_date) if start_date else None
+        end_date = request.args.get("end_date")
+        end_date = date.fromisoformat(end_date) if end_date else None
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
+
+    try:
+        fields = requested_fields(FOOD_LOG.names)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    schema = FOOD_LOG.sparse(fields, required=("id", "action_date"))
+
+    criteria = [Userlog.user_id == user_id]
     if action_filter:
-        query = query.filter_by(action=action_filter.upper())
+        criteria.append(Userlog.action == action_filter.upper())
     if food_id_filter:
-        query = query.filter_by(food_id=food_id_filter)
-
-    logs = query.order_by(Userlog.action_date.desc()).all()
-
-    log_list = []
-    for log in logs:
-        food = Food.query.get(log.food_id)
-        log_data = {
-            "id": log.id,
-            "food_id": log.food_id,
-            "food_name": food.name if food else None,
-            "action": log.action,
-            "quantity": log.quantity,
-            "action_date": log.action_date,
-            "reason": log.reason,
-            "remarks": log.remarks
-        }
-        log_list.append(log_data)
+        criteria.append(Userlog.food_id == food_id_filter)
+    if start_date:
+        criteria.append(Userlog.action_date >= start_date)
+    if end_date:
+        criteria.append(Userlog.action_date <= end_date)
+
+    query = (
+        food_log_query(schema=schema)
+        .filter(*criteria)
+        .order_by(Userlog.action_date.desc(), Userlog.id.desc())
+    )
+
+    # Paging is opt-in so existing clients still receive the full history
+    limit = None
+    cursor = None
+    if request.args.get("limit") or request.args.get("cursor"):
+        try:
+            limit = parse_page_size(request.args.get("limit"))
+            cursor = request.args.get("cursor")
+            cursor = decode_cursor(cursor) if cursor else None
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        if cursor:
+            query = query.filter(keyset_before(Userlog.action_date, Userlog.id, cursor))
+        query = query.limit(limit + 1)
+
+    # Counted without the food joins, and only once per listing
+    total_count = None
+    if count_requested(cursor):
+        total_count = db.session.query(func.count(Userlog.id)).filter(*criteria).scalar()
+
+    rows = query.all()
 
-    return jsonify({"food_logs": log_list, "total_count": len(log_list)})
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].action_date, rows[-1].id)
+
+    log_list = trim(schema.dump_all(rows), fields)
+
+    return jsonify({"food_logs": log_list, "total_count": total_count, "next_cursor": next_cursor})
 
 # ------- Get Food Log by ID -------
-@app.route("/api/food-logs/<int:id>", methods=["GET"])
+@api.route("/api/food-logs/<int:id>", methods=["GET"])
 @jwt_required()
 def get_food_log(id):
     user_id = get_jwt_identity()
-    log = Userlog.query.get_or_404(id)
+    row = food_log_query(Userlog.user_id).filter(Userlog.id == id).first()
+    if row is None:
+        abort(404)
 
-    if str(log.user_id) != str(user_id):
+    if str(row.user_id) != str(user_id):
         return jsonify({"error": "Unauthorized access to food log"}), 403
 
-    food = Food.query.get(log.food_id)
-
-    return jsonify({
-        "id": log.id,
-        "food_id": log.food_id,
-        "food_name": food.name if food else None,
-        "action": log.action,
-        "quantity": log.quantity,
-        "action_date": log.action_date,
-        "reason": log.reason,
-        "remarks": log.remarks
-    })
+    return jsonify(FOOD_LOG.dump(row[1:]))
 
 # ------- Delete Food Log -------
-@app.route("/api/food-logs/<int:id>", methods=["DELETE"])
+@api.route("/api/food-logs/<int:id>", methods=["DELETE"])
 @jwt_required()
 def delete_food_log(id):
     user_id = get_jwt_identity()
@@ -490,7 +944,7 @@ def delete_food_log(id):
 
 # ---------------- ANALYTICS ----------------
 # OLD JWT-PROTECTED VERSION - COMMENTED OUT FOR EVALUATION
-# @app.route("/api/analytics", methods=["GET"])
+# @api.route("/api/analytics", methods=["GET"])
 # @jwt_required()
 # def analytics():
 #     user_id = get_jwt_identity()
@@ -543,7 +997,7 @@ def delete_food_log(id):
 
 # ---------------- DONATION CENTERS CRUD ----------------
 # ------- Create Donation Center -------
-@app.route("/api/donation-centers", methods=["POST"])
+@api.route("/api/donation-centers", methods=["POST"])
 @jwt_required()
 def create_donation_center():
     data = request.get_json()
@@ -555,6 +1009,11 @@ def create_donation_center():
     if not name:
         return jsonify({"error": "Name is required"}), 400
 
+    try:
+        latitude, longitude = parse_coordinates(data.get("latitude"), data.get("longitude"))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
     center = DonationCenter(
         name=name,
         city=data.get("city"),
@@ -562,8 +1021,11 @@ def create_donation_center():
         phone=data.get("phone"),
         email=data.get("email"),
         accepts_items=data.get("accepts_items"),
-        open_hours=data.get("open_hours")
+        open_hours=data.get("open_hours"),
+        latitude=latitude,
+        longitude=longitude
     )
+    set_center_tags(center)
 
     db.session.add(center)
     db.session.commit()
@@ -571,56 +1033,99 @@ def create_donation_center():
     return jsonify({"message": "Donation center created successfully", "id": center.id}), 201
 
 # ------- List Donation Centers -------
-@app.route("/api/donation-centers", methods=["GET"])
+@api.route("/api/donation-centers", methods=["GET"])
 def list_donation_centers():
     city_filter = request.args.get("city")
 
-    query = DonationCenter.query
+    query = db.session.query(*DONATION_CENTER.columns)
 
     if city_filter:
         query = query.filter(DonationCenter.city.ilike(f"%{city_filter}%"))
 
-    centers = query.all()
+    center_list = DONATION_CENTER.dump_all(query.all())
+
+    return jsonify({"donation_centers": center_list, "total_count": len(center_list)})
+
+# ------- Search Donation Centers -------
+@api.route("/api/donation-centers/search", methods=["GET"])
+def search_donation_centers():
+    q = request.args.get("q")
+    tags = parse_tags(request.args.get("accepts"))
+
+    if not search_terms(q) and not tags:
+        return jsonify({"error": "Provide q and/or accepts"}), 400
+
+    try:
+        limit = parse_page_size(request.args.get("limit"))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    centers = search_centers(q, tags, limit)
+
+    center_list = [DONATION_CENTER.dump_object(center) for center in centers]
+
+    return jsonify({"donation_centers": center_list, "total_count": len(center_list)})
+
+# ------- Nearby Donation Centers -------
+DEFAULT_NEARBY_RADIUS_KM = 25
+MAX_NEARBY_RADIUS_KM = 500
+MAX_NEARBY_RESULTS = 100
+
+@api.route("/api/donation-centers/nearby", methods=["GET"])
+def nearby_donation_centers():
+    try:
+        lat, lon = parse_coordinates(request.args.get("lat"), request.args.get("lon"))
+        radius_km = float(request.args.get("radius_km", DEFAULT_NEARBY_RADIUS_KM))
+        k = int(request.args.get("k", 10))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    if lat is None:
+        return jsonify({"error": "lat and lon are required"}), 400
+    if not 0 < radius_km <= MAX_NEARBY_RADIUS_KM:
+        return jsonify({"error": f"radius_km must be between 0 and {MAX_NEARBY_RADIUS_KM}"}), 400
+    if not 1 <= k <= MAX_NEARBY_RESULTS:
+        return jsonify({"error": f"k must be between 1 and {MAX_NEARBY_RESULTS}"}), 400
+
+    nearest = center_grid().nearest(lat, lon, k, radius_km)
+    centers = {
+        center.id: center
+        for center in DonationCenter.query.filter(DonationCenter.id.in_([center_id for center_id, _ in nearest]))
+    } if nearest else {}
 
     center_list = []
-    for center in centers:
-        center_list.append({
-            "id": center.id,
-            "name": center.name,
-            "city": center.city,
-            "address": center.address,
-            "phone": center.phone,
-            "email": center.email,
-            "accepts_items": center.accepts_items,
-            "open_hours": center.open_hours
-        })
+    for center_id, distance in nearest:
+        center = centers.get(center_id)
+        if center is None:
+            continue
+        center_data = DONATION_CENTER.dump_object(center)
+        center_data["distance_km"] = round(distance, 3)
+        center_list.append(center_data)
 
     return jsonify({"donation_centers": center_list, "total_count": len(center_list)})
 
 # ------- Get Donation Center by ID -------
-@app.route("/api/donation-centers/<int:id>", methods=["GET"])
+@api.route("/api/donation-centers/<int:id>", methods=["GET"])
 def get_donation_center(id):
     center = DonationCenter.query.get_or_404(id)
 
-    return jsonify({
-        "id": center.id,
-        "name": center.name,
-        "city": center.city,
-        "address": center.address,
-        "phone": center.phone,
-        "email": center.email,
-        "accepts_items": center.accepts_items,
-        "open_hours": center.open_hours,
-        "created_at": center.created_at
-    })
+    return jsonify(DONATION_CENTER_DETAIL.dump_object(center))
 
 # ------- Update Donation Center -------
-@app.route("/api/donation-centers/<int:id>", methods=["PUT"])
+@api.route("/api/donation-centers/<int:id>", methods=["PUT"])
 @jwt_required()
 def update_donation_center(id):
     center = DonationCenter.query.get_or_404(id)
     data = request.get_json()
 
+    try:
+        latitude, longitude = parse_coordinates(
+            data.get("latitude", center.latitude),
+            data.get("longitude", center.longitude)
+        )
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
     center.name = data.get("name", center.name)
     center.city = data.get("city", center.city)
     center.address = data.get("address", center.address)
@@ -628,13 +1133,16 @@ def update_donation_center(id):
     center.email = data.get("email", center.email)
     center.accepts_items = data.get("accepts_items", center.accepts_items)
     center.open_hours = data.get("open_hours", center.open_hours)
+    center.latitude = latitude
+    center.longitude = longitude
+    set_center_tags(center)
 
     db.session.commit()
 
     return jsonify({"message": "Donation center updated successfully"})
 
 # ------- Delete Donation Center -------
-@app.route("/api/donation-centers/<int:id>", methods=["DELETE"])
+@api.route("/api/donation-centers/<int:id>", methods=["DELETE"])
 @jwt_required()
 def delete_donation_center(id):
     center = DonationCenter.query.get_or_404(id)
@@ -646,7 +1154,7 @@ def delete_donation_center(id):
 
 # ---------------- DONATION OFFERS CRUD ----------------
 # ------- Create Donation Offer -------
-@app.route("/api/donation-offers", methods=["POST"])
+@api.route("/api/donation-offers", methods=["POST"])
 @jwt_required()
 def create_donation_offer():
     user_id = get_jwt_identity()
@@ -707,83 +1215,126 @@ def create_donation_offer():
 
     return jsonify({"message": "Donation offer created successfully", "id": offer.id}), 201
 
+def donation_offer_query(*columns, schema=DONATION_OFFER):
+    """Rows of `schema`, after any extra columns; joins DonationCenter only for its name."""
+    query = db.session.query(*columns, *schema.columns).select_from(DonationOffer)
+    if "donation_center_name" in schema.names:
+        query = query.outerjoin(DonationCenter, DonationCenter.id == DonationOffer.donation_center_id)
+    return query
+
 # ------- List Donation Offers -------
-@app.route("/api/donation-offers", methods=["GET"])
+@api.route("/api/donation-offers", methods=["GET"])
 @jwt_required()
 def list_donation_offers():
     user_id = get_jwt_identity()
     status_filter = request.args.get("status")
 
-    query = DonationOffer.query.filter_by(user_id=user_id)
+    try:
+        fields = requested_fields(DONATION_OFFER.names + ("items", "item_count"))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    schema = DONATION_OFFER.sparse(fields, required=("id", "created_at"))
 
+    criteria = [DonationOffer.user_id == user_id]
     if status_filter:
-        query = query.filter_by(status=status_filter.upper())
+        criteria.append(DonationOffer.status == status_filter.upper())
 
-    offers = query.order_by(DonationOffer.created_at.desc()).all()
+    query = (
+        donation_offer_query(schema=schema)
+        .filter(*criteria)
+        .order_by(DonationOffer.created_at.desc(), DonationOffer.id.desc())
+    )
 
-    offer_list = []
-    for offer in offers:
-        center = DonationCenter.query.get(offer.donation_center_id) if offer.donation_center_id else None
-        items = DonationOfferItem.query.filter_by(donation_offer_id=offer.id).all()
+    # Paging is opt-in so existing clients still receive every offer
+    limit = None
+    cursor = None
+    if request.args.get("limit") or request.args.get("cursor"):
+        try:
+            limit = parse_page_size(request.args.get("limit"))
+            cursor = request.args.get("cursor")
+            cursor = decode_cursor(cursor, parse=datetime.fromisoformat) if cursor else None
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        if cursor:
+            query = query.filter(keyset_before(DonationOffer.created_at, DonationOffer.id, cursor))
+        query = query.limit(limit + 1)
+
+    # Counted without the center join, and only once per listing
+    total_count = None
+    if count_requested(cursor):
+        total_count = db.session.query(func.count(DonationOffer.id)).filter(*criteria).scalar()
+
+    rows = query.all()
+
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    offer_list = schema.dump_all(rows)
+    if fields is None or "items" in fields or "item_count" in fields:
+        items = offer_items([offer["id"] for offer in offer_list])
+        for offer in offer_list:
+            offer["items"] = items[offer["id"]]
+            offer["item_count"] = len(offer["items"])
+    offer_list = trim(offer_list, fields)
 
-        item_list = []
-        for item in items:
-            food = Food.query.get(item.food_id)
-            item_list.append({
-                "id": item.id,
-                "food_id": item.food_id,
-                "food_name": food.name if food else None,
-                "quantity": item.quantity
-            })
-
-        offer_list.append({
-            "id": offer.id,
-            "donation_center_id": offer.donation_center_id,
-            "donation_center_name": center.name if center else None,
-            "status": offer.status,
-            "remarks": offer.remarks,
-            "created_at": offer.created_at,
-            "items": item_list,
-            "item_count": len(item_list)
-        })
-
-    return jsonify({"donation_offers": offer_list, "total_count": len(offer_list)})
+    return jsonify({
+        "donation_offers": offer_list,
+        "total_count": total_count,
+        "next_cursor": next_cursor
+    })
+
+# ------- Suggest Donation Offers -------
+@api.route("/api/donation-offers/suggestions", methods=["GET"])
+@jwt_required()
+def suggest_donation_offers():
+    user_id = get_jwt_identity()
+
+    try:
+        origin = parse_coordinates(request.args.get("lat"), request.args.get("lon"))
+        radius_km = request.args.get("radius_km")
+        radius_km = float(radius_km) if radius_km else None
+        max_offers = int(request.args.get("max_offers", 5))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    if radius_km is not None and not 0 < radius_km <= MAX_NEARBY_RADIUS_KM:
+        return jsonify({"error": f"radius_km must be between 0 and {MAX_NEARBY_RADIUS_KM}"}), 400
+    if not 1 <= max_offers <= 50:
+        return jsonify({"error": "max_offers must be between 1 and 50"}), 400
+
+    offers, item_count = suggest_offers(
+        user_id,
+        origin=origin if origin[0] is not None else None,
+        radius_km=radius_km,
+        max_offers=max_offers
+    )
+
+    return jsonify({
+        "suggestions": offers,
+        "total_count": len(offers),
+        "items_considered": item_count
+    })
 
 # ------- Get Donation Offer by ID -------
-@app.route("/api/donation-offers/<int:id>", methods=["GET"])
+@api.route("/api/donation-offers/<int:id>", methods=["GET"])
 @jwt_required()
 def get_donation_offer(id):
     user_id = get_jwt_identity()
-    offer = DonationOffer.query.get_or_404(id)
+    row = donation_offer_query(DonationOffer.user_id).filter(DonationOffer.id == id).first()
+    if row is None:
+        abort(404)
 
-    if str(offer.user_id) != str(user_id):
+    if str(row.user_id) != str(user_id):
         return jsonify({"error": "Unauthorized access to donation offer"}), 403
 
-    center = DonationCenter.query.get(offer.donation_center_id) if offer.donation_center_id else None
-    items = DonationOfferItem.query.filter_by(donation_offer_id=offer.id).all()
-
-    item_list = []
-    for item in items:
-        food = Food.query.get(item.food_id)
-        item_list.append({
-            "id": item.id,
-            "food_id": item.food_id,
-            "food_name": food.name if food else None,
-            "quantity": item.quantity
-        })
-
-    return jsonify({
-        "id": offer.id,
-        "donation_center_id": offer.donation_center_id,
-        "donation_center_name": center.name if center else None,
-        "status": offer.status,
-        "remarks": offer.remarks,
-        "created_at": offer.created_at,
-        "items": item_list
-    })
+    offer = DONATION_OFFER.dump(row[1:])
+    offer["items"] = offer_items([id])[id]
+    return jsonify(offer)
 
 # ------- Update Donation Offer Status -------
-@app.route("/api/donation-offers/<int:id>/status", methods=["PATCH"])
+@api.route("/api/donation-offers/<int:id>/status", methods=["PATCH"])
 @jwt_required()
 def update_donation_offer_status(id):
     user_id = get_jwt_identity()
@@ -804,9 +1355,13 @@ def update_donation_offer_status(id):
 
     # When picked up, update food items to DONATED status and reduce quantities
     if new_status == "PICKED_UP" and old_status != "PICKED_UP":
-        items = DonationOfferItem.query.filter_by(donation_offer_id=offer.id).all()
+        items = (
+            DonationOfferItem.query.filter_by(donation_offer_id=offer.id)
+            .options(joinedload(DonationOfferItem.food))
+            .all()
+        )
         for item in items:
-            food = Food.query.get(item.food_id)
+            food = item.food
             if food:
                 food.quantity -= item.quantity
                 if food.quantity <= 0:
@@ -829,7 +1384,7 @@ def update_donation_offer_status(id):
     return jsonify({"message": f"Donation offer status updated to {new_status}"})
 
 # ------- Delete/Cancel Donation Offer -------
-@app.route("/api/donation-offers/<int:id>", methods=["DELETE"])
+@api.route("/api/donation-offers/<int:id>", methods=["DELETE"])
 @jwt_required()
 def delete_donation_offer(id):
     user_id = get_jwt_identity()
@@ -849,8 +1404,66 @@ def delete_donation_offer(id):
 
     return jsonify({"message": "Donation offer deleted successfully"})
 
+# ---------------- EXPORT ----------------
+@api.route("/api/export/<dataset>", methods=["GET"])
+@jwt_required()
+def export_data(dataset):
+    user_id = get_jwt_identity()
+    if dataset not in ("food", "food-logs"):
+        return jsonify({"error": "Invalid dataset. Must be one of: food, food-logs"}), 404
+
+    fmt = request.args.get("format", "csv").lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": "Invalid format. Must be one of: csv, ndjson"}), 400
+
+    compress = "gzip" in request.accept_encodings
+    chunks = iter_export(export_query(dataset, user_id, archive_requested()), fmt)
+    response = Response(
+        stream_with_context(encode_chunks(chunks, compress)),
+        mimetype=EXPORT_FORMATS[fmt]
+    )
+    response.headers["Content-Disposition"] = f'attachment; filename="{dataset}.{fmt}"'
+    response.headers["Vary"] = "Accept-Encoding"
+    if compress:
+        response.headers["Content-Encoding"] = "gzip"
+    return response
+
+# ---------------- DELTA SYNC ----------------
+@api.route("/api/sync", methods=["GET"])
+@jwt_required()
+@versioned
+def sync_changes():
+    user_id = get_jwt_identity()
+    try:
+        since = request.args.get("since")
+        since = decode_sync_cursor(since) if since else None
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    return jsonify(changes_since(int(user_id), since))
+
+# ---------------- LIVE UPDATES ----------------
+@api.route("/api/stream", methods=["GET"])
+@jwt_required(locations=["headers", "query_string"])
+def stream_events():
+    # EventSource cannot set headers, so the token may also come as ?jwt=
+    user_id = int(get_jwt_identity())
+    return Response(
+        event_stream(user_id),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# ---------------- METRICS ----------------
+@api.route("/api/metrics", methods=["GET"])
+def get_metrics():
+    token = current_app.config["METRICS_TOKEN"]
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return jsonify({"error": "Invalid metrics token"}), 401
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
 # ---------------- HEALTH CHECK ----------------
-@app.route("/api/health")
+@api.route("/api/health")
 def health():
     return jsonify({"status": "OK"})
 
@@ -862,7 +1475,7 @@ def health():
 DEFAULT_USER_ID = 1
 
 # ------- Add Food (No Auth) -------
-@app.route("/api/foods", methods=["POST"])
+@api.route("/api/foods", methods=["POST"])
 def create_food_no_auth():
     data = request.get_json()
     
@@ -889,33 +1502,25 @@ def create_food_no_auth():
     return jsonify({"message": "Successfully added food item", "id": food.id}), 201
 
 # ------- Get All Foods (No Auth) -------
-@app.route("/api/foods", methods=["GET"])
+@api.route("/api/foods", methods=["GET"])
 def get_foods_no_auth():
-    items = Food.query.filter_by(user_id=DEFAULT_USER_ID).all()
+    try:
+        fields = requested_fields(FOOD.names + FOOD_COMPUTED)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
 
-    result = []
-    for item in items:
-        expiry_state, days_left = get_expiry_info(item)
-        result.append({
-            "id": item.id,
-            "name": item.name,
-            "category": item.category,
-            "quantity": item.quantity,
-            "unit": item.unit,
-            "purchase_date": str(item.purchase_date) if item.purchase_date else None,
-            "expiry_date": str(item.expiry_date) if item.expiry_date else None,
-            "storage_location": item.storage_location,
-            "status": item.status,
-            "reason_of_waste": item.reason_of_waste,
-            "expiry_state": expiry_state,
-            "days_left": days_left,
-            "created_at": str(item.created_at)
-        })
-
-    return jsonify(result)
+    today = date.today()
+    schema = FOOD.sparse(fields, required=("id", "expiry_date"))
+    rows = (
+        food_query(schema, today, lambda model: [model.user_id == DEFAULT_USER_ID], archive_requested())
+        .order_by(Food.id)
+        .all()
+    )
+
+    return jsonify(trim(food_data(schema, rows, today), fields))
 
 # ------- Update Food Status (No Auth) -------
-@app.route("/api/foods/<int:id>/status", methods=["POST", "PATCH"])
+@api.route("/api/foods/<int:id>/status", methods=["POST", "PATCH"])
 def update_food_status_no_auth(id):
     food = Food.query.get_or_404(id)
     data = request.get_json()
@@ -957,72 +1562,40 @@ def update_food_status_no_auth(id):
     })
 
 # ------- Get Analytics (JWT) -------
-@app.route("/api/analytics", methods=["GET"])
+@api.route("/api/analytics", methods=["GET"])
 @jwt_required()
+@versioned
 def get_analytics():
     user_id = get_jwt_identity()
-    # Get all food items
-    all_items = Food.query.filter_by(user_id=user_id).all()
-    
-    # Count by status
-    total_items = len(all_items)
-    available_count = sum(1 for item in all_items if item.status == "AVAILABLE")
-    used_count = sum(1 for item in all_items if item.status == "USED")
-    donated_count = sum(1 for item in all_items if item.status == "DONATED")
-    wasted_count = sum(1 for item in all_items if item.status == "WASTED")
-    
-    # Count by expiry state (for available items only)
-    fresh_count = 0
-    near_expiry_count = 0
-    expired_count = 0
-    
-    for item in all_items:
-        if item.status == "AVAILABLE":
-            expiry_state, _ = get_expiry_info(item)
-            if expiry_state == "FRESH":
-                fresh_count += 1
-            elif expiry_state == "NEAR_EXPIRY":
-                near_expiry_count += 1
-            elif expiry_state == "EXPIRED":
-                expired_count += 1
-    
-    # Waste by category
-    waste_by_category = {}
-    for item in all_items:
-        if item.status == "WASTED":
-            category = item.category or "Unknown"
-            waste_by_category[category] = waste_by_category.get(category, 0) + 1
-    
-    # Waste by reason
-    waste_by_reason = {}
-    for item in all_items:
-        if item.status == "WASTED" and item.reason_of_waste:
-            reason = item.reason_of_waste
-            waste_by_reason[reason] = waste_by_reason.get(reason, 0) + 1
-    
-    # Get logs
-    logs = Userlog.query.filter_by(user_id=user_id).all()
-    
-    return jsonify({
-        "summary": {
-            "total_items": total_items,
-            "available": available_count,
-            "used": used_count,
-            "donated": donated_count,
-            "wasted": wasted_count,
-        },
-        "expiry_status": {
-            "fresh": fresh_count,
-            "near_expiry": near_expiry_count,
-            "expired": expired_count
-        },
-        "waste_by_category": waste_by_category,
-        "waste_by_reason": waste_by_reason,
-        "total_logs": len(logs)
-    })
+    return jsonify(user_analytics(user_id))
+
+# ------- Waste Trends (JWT) -------
+@api.route("/api/analytics/trends", methods=["GET"])
+@jwt_required()
+@versioned
+def get_waste_trends():
+    user_id = get_jwt_identity()
+
+    granularity = request.args.get("granularity", "day").lower()
+    if granularity not in GRANULARITIES:
+        return jsonify({"error": "Invalid granularity. Must be one of: day, week, month"}), 400
+
+    periods = request.args.get("periods", GRANULARITIES[granularity])
+    try:
+        periods = int(periods)
+    except ValueError:
+        return jsonify({"error": "periods must be an integer"}), 400
+    if not 1 <= periods <= MAX_PERIODS:
+        return jsonify({"error": f"periods must be between 1 and {MAX_PERIODS}"}), 400
+
+    split = request.args.get("split")
+    if split not in (None, "", "category"):
+        return jsonify({"error": "Invalid split. Only 'category' is supported"}), 400
+
+    return jsonify(waste_trends(user_id, granularity, periods, split == "category"))
 
 # ------- Delete Food (No Auth) -------
-@app.route("/api/foods/<int:id>", methods=["DELETE"])
+@api.route("/api/foods/<int:id>", methods=["DELETE"])
 def delete_food_no_auth(id):
     food = Food.query.get_or_404(id)
     db.session.delete(food)
@@ -1031,4 +1604,9 @@ def delete_food_no_auth(id):
 
 # ---------------- RUN SERVER ----------------
 if __name__ == "__main__":
+    # Development server; creates the database on first run for convenience
+    app = create_app()
+    with app.app_context():
+        init_db()
+    start_background_tasks(app)
     app.run(debug=True)
@@ -0,0 +1,217 @@
+import re
+from datetime import datetime
+
+from sqlalchemy import or_
+
+from analytics import days_until, expiry_state_expr
+from cache import cached_catalog
+from geo import haversine_km
+from models import db, DonationCenter, DonationCenterTag, DonationOffer, DonationOfferItem, Food
+
+# Offers in these states still hold on to their food items
+ACTIVE_OFFER_STATUSES = ["PENDING", "ACCEPTED"]
+
+CATEGORY_WEIGHT = 0.5
+HOURS_WEIGHT = 0.3
+DISTANCE_WEIGHT = 0.2
+DISTANCE_SCALE_KM = 10.0
+
+HOURS_PATTERN = re.compile(
+    r"(\d{1,2})(?::(\d{2}))?\s*(am|pm)?\s*(?:-|–|to)\s*(\d{1,2})(?::(\d{2}))?\s*(am|pm)?",
+    re.IGNORECASE
+)
+
+
+def _minutes(hour, minute, meridiem):
+    hour = int(hour) % 24
+    if meridiem:
+        hour = hour % 12 + (12 if meridiem.lower() == "pm" else 0)
+    return hour * 60 + int(minute or 0)
+
+
+def parse_open_hours(open_hours):
+    """Parse strings like "9 AM - 5 PM", "09:00-17:00" or "24/7".
+
+    Returns (open_minute, close_minute) within the day, or None if the
+    format is not understood. A close before the open means the center
+    is open past midnight.
+    """
+    if not open_hours:
+        return None
+    text = open_hours.strip().lower()
+    if text in ("24/7", "24 hours", "24hrs", "always"):
+        return 0, 24 * 60
+    match = HOURS_PATTERN.search(text)
+    if not match:
+        return None
+    open_hour, open_minute, open_meridiem, close_hour, close_minute, close_meridiem = match.groups()
+    # "9-5 PM" style ranges share the trailing meridiem
+    if close_meridiem and not open_meridiem and int(open_hour) > int(close_hour):
+        open_meridiem = "am"
+    return (
+        _minutes(open_hour, open_minute, open_meridiem or close_meridiem),
+        _minutes(close_hour, close_minute, close_meridiem)
+    )
+
+
+def hours_score(hours, now):
+    """1 when open at `now`, 0.5 when hours are unknown, 0.25 when closed."""
+    if hours is None:
+        return 0.5
+    open_minute, close_minute = hours
+    minute = now.hour * 60 + now.minute
+    if open_minute <= close_minute:
+        is_open = open_minute <= minute < close_minute
+    else:
+        is_open = minute >= open_minute or minute < close_minute
+    return 1.0 if is_open else 0.25
+
+
+def category_keys(category):
+    """Tags a food category can match: the whole name and each word in it."""
+    category = (category or "").strip().lower()
+    return {category, *re.findall(r"\w+", category)} - {""}
+
+
+class CenterCatalog:
+    """Donation centers with an inverted index from accepted tag to centers."""
+
+    def __init__(self, centers, tag_rows):
+        self.centers = {}
+        for center_id, name, latitude, longitude, open_hours in centers:
+            self.centers[center_id] = {
+                "name": name,
+                "latitude": latitude,
+                "longitude": longitude,
+                "hours": parse_open_hours(open_hours)
+            }
+        self.by_tag = {}
+        tagged = set()
+        for center_id, tag in tag_rows:
+            self.by_tag.setdefault(tag, set()).add(center_id)
+            tagged.add(center_id)
+        # Centers that list nothing are treated as accepting anything
+        self.general = set(self.centers) - tagged
+
+    def candidates(self, category):
+        """Map center_id -> category match score for one food category."""
+        matches = {center_id: 0.5 for center_id in self.general}
+        for key in category_keys(category):
+            for center_id in self.by_tag.get(key, ()):
+                matches[center_id] = 1.0
+        return matches
+
+
+def center_catalog():
+    """Catalog of all centers, rebuilt when centers or their tags change."""
+    def build():
+        centers = db.session.query(
+            DonationCenter.id, DonationCenter.name, DonationCenter.latitude,
+            DonationCenter.longitude, DonationCenter.open_hours
+        ).all()
+        tag_rows = db.session.query(DonationCenterTag.center_id, DonationCenterTag.tag).all()
+        return CenterCatalog(centers, tag_rows)
+
+    return cached_catalog("donation_centers", "center_catalog", build)
+
+
+def surplus_items(user_id, today, limit):
+    """AVAILABLE, unexpired items not already promised to an active offer.
+
+    Ordered soonest-expiring first; items without an expiry date come last.
+    """
+    promised = (
+        db.session.query(DonationOfferItem.food_id)
+        .join(DonationOffer, DonationOffer.id == DonationOfferItem.donation_offer_id)
+        .filter(DonationOffer.user_id == user_id, DonationOffer.status.in_(ACTIVE_OFFER_STATUSES))
+    )
+    return (
+        db.session.query(
+            Food.id, Food.name, Food.category, Food.quantity, Food.unit, Food.expiry_date,
+            expiry_state_expr(today).label("expiry_state")
+        )
+        .filter(
+            Food.user_id == user_id,
+            Food.status == "AVAILABLE",
+            Food.quantity > 0,
+            or_(Food.expiry_date.is_(None), Food.expiry_date >= today),
+            Food.id.notin_(promised)
+        )
+        .order_by(Food.expiry_date.asc().nulls_last(), Food.id.asc())
+        .limit(limit)
+        .all()
+    )
+
+
+def suggest_offers(user_id, origin=None, radius_km=None, now=None, item_limit=500, max_offers=5):
+    """Propose donation offers for the user's surplus, best first.
+
+    Each item goes to the center with the highest combined score
+    (category match, open hours now, distance from origin). Items expiring
+    within three days count double when ranking offers. Candidate centers
+    come from the catalog's inverted index once per distinct category, not
+    once per item.
+    """
+    now = now or datetime.now()
+    today = now.date()
+    catalog = center_catalog()
+    items = surplus_items(user_id, today, item_limit)
+
+    center_scores = {}
+
+    def center_score(center_id, category_score):
+        center = catalog.centers[center_id]
+        if center_id not in center_scores:
+            distance = None
+            if origin and center["latitude"] is not None and center["longitude"] is not None:
+                distance = haversine_km(origin[0], origin[1], center["latitude"], center["longitude"])
+            center_scores[center_id] = (hours_score(center["hours"], now), distance)
+        hours, distance = center_scores[center_id]
+        if origin and (distance is None or (radius_km and distance > radius_km)):
+            return None, distance
+        distance_score = 1 / (1 + distance / DISTANCE_SCALE_KM) if distance is not None else 0.5
+        score = CATEGORY_WEIGHT * category_score + HOURS_WEIGHT * hours + DISTANCE_WEIGHT * distance_score
+        return score, distance
+
+    best_by_category = {}
+    offers = {}
+    for item in items:
+        key = (item.category or "").strip().lower()
+        if key not in best_by_category:
+            best = None
+            for center_id, category_score in catalog.candidates(item.category).items():
+                score, distance = center_score(center_id, category_score)
+                if score is not None and (best is None or (score, -center_id) > (best[1], -best[0])):
+                    best = (center_id, score, distance)
+            best_by_category[key] = best
+        best = best_by_category[key]
+        if best is None:
+            continue
+
+        center_id, score, distance = best
+        days_left = days_until(item.expiry_date, today)
+        urgent = days_left is not None and days_left <= 3
+        offer = offers.setdefault(center_id, {
+            "donation_center_id": center_id,
+            "donation_center_name": catalog.centers[center_id]["name"],
+            "distance_km": round(distance, 3) if distance is not None else None,
+            "center_score": round(score, 3),
+            "score": 0.0,
+            "items": []
+        })
+        offer["score"] += score * (2 if urgent else 1)
+        offer["items"].append({
+            "food_id": item.id,
+            "food_name": item.name,
+            "category": item.category,
+            "quantity": item.quantity,
+            "unit": item.unit,
+            "expiry_date": item.expiry_date,
+            "days_left": days_left,
+            "expiry_state": item.expiry_state
+        })
+
+    ranked = sorted(offers.values(), key=lambda offer: (-offer["score"], offer["donation_center_id"]))
+    for offer in ranked:
+        offer["score"] = round(offer["score"], 3)
+    return ranked[:max_offers], len(items)
@@ -0,0 +1,156 @@
+import threading
+import time
+from collections import defaultdict
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from models import db
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+# Statements listed in a slow-request log line
+SLOW_LOG_TOP_QUERIES = 5
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+
+class Metrics:
+    """Per-process request and SQL metrics, keyed by (method, route)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = defaultdict(int)
+        self.latency = {}
+        self.response_size = {}
+        self.queries = {}
+        self.sql_statements = defaultdict(int)
+        self.sql_seconds = defaultdict(float)
+
+    def _histogram(self, family, key, buckets):
+        if key not in family:
+            family[key] = Histogram(buckets)
+        return family[key]
+
+    def record(self, method, route, status, seconds, size, query_count, query_seconds):
+        key = (method, route)
+        with self._lock:
+            self.requests[(method, route, status)] += 1
+            self._histogram(self.latency, key, LATENCY_BUCKETS).observe(seconds)
+            self._histogram(self.queries, key, QUERY_BUCKETS).observe(query_count)
+            if size is not None:
+                self._histogram(self.response_size, key, SIZE_BUCKETS).observe(size)
+            self.sql_statements[key] += query_count
+            self.sql_seconds[key] += query_seconds
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            lines = []
+            _counter(lines, "http_requests_total", "HTTP requests handled.",
+                     {_labels(method=m, route=r, status=s): v for (m, r, s), v in self.requests.items()})
+            _histograms(lines, "http_request_duration_seconds", "Time to build the response.", self.latency)
+            _histograms(lines, "http_response_size_bytes", "Response body size.", self.response_size)
+            _histograms(lines, "db_queries_per_request", "SQL statements executed per request.", self.queries)
+            _counter(lines, "db_statements_total", "SQL statements executed.",
+                     {_labels(method=m, route=r): v for (m, r), v in self.sql_statements.items()})
+            _counter(lines, "db_statement_seconds_total", "Time spent executing SQL statements.",
+                     {_labels(method=m, route=r): v for (m, r), v in self.sql_seconds.items()})
+            return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+def _counter(lines, name, help_text, samples):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} counter")
+    for labels, value in sorted(samples.items()):
+        lines.append(f"{name}{{{labels}}} {value}")
+
+
+def _histograms(lines, name, help_text, family):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for (method, route), histogram in sorted(family.items()):
+        labels = _labels(method=method, route=route)
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+        lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+        lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+
+metrics = Metrics()
+
+
+def _before_request():
+    g.metrics_start = time.perf_counter()
+    g.sql_statements = defaultdict(lambda: [0, 0.0])
+
+
+def _after_request(response):
+    start = g.pop("metrics_start", None)
+    if start is None:
+        return response
+    seconds = time.perf_counter() - start
+    statements = g.pop("sql_statements", {})
+    query_count = sum(count for count, _ in statements.values())
+    query_seconds = sum(total for _, total in statements.values())
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    # Streamed bodies have no length until they are sent
+    size = None if response.is_streamed else response.calculate_content_length()
+
+    metrics.record(request.method, route, str(response.status_code), seconds, size, query_count, query_seconds)
+
+    threshold = current_app.config["SLOW_REQUEST_MS"]
+    if threshold and seconds * 1000 >= threshold:
+        top = sorted(statements.items(), key=lambda item: item[1][1], reverse=True)[:SLOW_LOG_TOP_QUERIES]
+        current_app.logger.warning(
+            "Slow request %s %s: %.1f ms, %d queries (%.1f ms)%s",
+            request.method, route, seconds * 1000, query_count, query_seconds * 1000,
+            "".join(
+                f"\n  {count}x {total * 1000:.1f} ms  {' '.join(statement.split())[:200]}"
+                for statement, (count, total) in top
+            )
+        )
+    return response
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context.metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and "sql_statements" in g:
+        entry = g.sql_statements[statement]
+        entry[0] += 1
+        entry[1] += time.perf_counter() - context.metrics_start
+
+
+def init_metrics(app):
+    """Instrument the app's requests and its engine's SQL statements."""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(db.engine, "after_cursor_execute", _after_cursor_execute)
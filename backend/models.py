@@ -24,21 +24,82 @@ class Food(db.Model):
     status = db.Column(db.String(20), default = "AVAILABLE")
     reason_of_waste = db.Column(db.String(100))
     created_at = db.Column(db.DateTime, default = datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default = datetime.utcnow, onupdate = datetime.utcnow)
+    # The user's data version at the last write, used as the sync cursor (see sync.py)
+    sync_version = db.Column(db.Integer)
+
+    __table_args__ = (
+        db.Index("ix_food_user_status_expiry", "user_id", "status", "expiry_date"),
+        db.Index("ix_food_status_expiry", "status", "expiry_date"),
+        db.Index("ix_food_user_sync_version", "user_id", "sync_version"),
+        # Never reuse ids: archived items keep theirs (see schema.enable_food_autoincrement)
+        {"sqlite_autoincrement": True},
+    )
+
+class FoodArchive(db.Model):
+    """Finalized Food rows moved out of the hot table by archive.py; ids are kept."""
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    category = db.Column(db.String(50), nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+    quantity = db.Column(db.Float, nullable=False)
+    unit = db.Column(db.String(20))
+    purchase_date = db.Column(db.Date)
+    expiry_date = db.Column(db.Date)
+    storage_location = db.Column(db.String(100))
+    status = db.Column(db.String(20))
+    reason_of_waste = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    sync_version = db.Column(db.Integer)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index("ix_food_archive_user_status", "user_id", "status", "id"),
+    )
 
 class Category(db.Model):
     id =db.Column(db.Integer, primary_key = True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable = False)
     name = db.Column(db.String(20), nullable = False)
+    updated_at = db.Column(db.DateTime, default = datetime.utcnow, onupdate = datetime.utcnow)
+    sync_version = db.Column(db.Integer)
+
+    __table_args__ = (
+        db.Index("ix_category_user_sync_version", "user_id", "sync_version"),
+    )
 
 class Userlog(db.Model):
     id = db.Column(db.Integer, primary_key = True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable = False)
-    food_id = db.Column(db.Integer, db.ForeignKey("food.id"), nullable = False)
+    # Not a foreign key: the item may have moved to FoodArchive
+    food_id = db.Column(db.Integer, nullable = False)
     action = db.Column(db.String(20), nullable = False)
     quantity = db.Column(db.Float, nullable = False)
     action_date = db.Column(db.Date, default = datetime.utcnow)
     reason = db.Column(db.String(100))
     remarks = db.Column(db.String(100))
+    updated_at = db.Column(db.DateTime, default = datetime.utcnow, onupdate = datetime.utcnow)
+    sync_version = db.Column(db.Integer)
+
+    __table_args__ = (
+        db.Index("ix_userlog_user_action_date", "user_id", "action_date", "id"),
+        db.Index("ix_userlog_user_sync_version", "user_id", "sync_version"),
+    )
+
+class UserlogDaily(db.Model):
+    """Userlog totals per user, day, action and food category, for compacted days."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    action = db.Column(db.String(20), nullable=False)
+    category = db.Column(db.String(50), nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    quantity = db.Column(db.Float, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "day", "action", "category", name="uq_userlog_daily"),
+    )
 
 class DonationCenter(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -49,8 +110,21 @@ class DonationCenter(db.Model):
     email = db.Column(db.String(120))
     accepts_items = db.Column(db.String(100))  # e.g. "cooked,dry,dairy"
     open_hours = db.Column(db.String(50))
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    tags = db.relationship("DonationCenterTag", cascade="all, delete-orphan", backref="center")
+
+class DonationCenterTag(db.Model):
+    """One normalized entry of DonationCenter.accepts_items, indexed for lookup by tag."""
+    center_id = db.Column(db.Integer, db.ForeignKey("donation_center.id"), primary_key=True)
+    tag = db.Column(db.String(30), primary_key=True)
+
+    __table_args__ = (
+        db.Index("ix_donation_center_tag_tag", "tag", "center_id"),
+    )
+
 class DonationOffer(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
@@ -58,9 +132,94 @@ class DonationOffer(db.Model):
     status = db.Column(db.String(20), default="PENDING")  # PENDING, ACCEPTED, REJECTED, PICKED_UP, CANCELLED
     remarks = db.Column(db.String(200))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    sync_version = db.Column(db.Integer)
+
+    center = db.relationship("DonationCenter", backref="offers")
+    items = db.relationship(
+        "DonationOfferItem",
+        backref="offer",
+        cascade="all, delete-orphan",
+        order_by="DonationOfferItem.id"
+    )
+
+    __table_args__ = (
+        db.Index("ix_donation_offer_user_created", "user_id", "created_at", "id"),
+        db.Index("ix_donation_offer_user_sync_version", "user_id", "sync_version"),
+    )
 
 class DonationOfferItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    donation_offer_id = db.Column(db.Integer, db.ForeignKey("donation_offer.id"), nullable=False)
-    food_id = db.Column(db.Integer, db.ForeignKey("food.id"), nullable=False)
-    quantity = db.Column(db.Float, nullable=False)
\ No newline at end of file
+    donation_offer_id = db.Column(db.Integer, db.ForeignKey("donation_offer.id"), nullable=False, index=True)
+    # Not a foreign key: the item may have moved to FoodArchive
+    food_id = db.Column(db.Integer, nullable=False)
+    quantity = db.Column(db.Float, nullable=False)
+
+    food = db.relationship("Food", primaryjoin="foreign(DonationOfferItem.food_id) == Food.id")
+
+class UserStats(db.Model):
+    """Per-user analytics rollup, maintained incrementally by stats.py."""
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    total_items = db.Column(db.Integer, nullable=False, default=0)
+    available_count = db.Column(db.Integer, nullable=False, default=0)
+    used_count = db.Column(db.Integer, nullable=False, default=0)
+    donated_count = db.Column(db.Integer, nullable=False, default=0)
+    wasted_count = db.Column(db.Integer, nullable=False, default=0)
+    available_quantity = db.Column(db.Float, nullable=False, default=0)
+    used_quantity = db.Column(db.Float, nullable=False, default=0)  # from Userlog
+    donated_quantity = db.Column(db.Float, nullable=False, default=0)  # from Userlog
+    wasted_quantity = db.Column(db.Float, nullable=False, default=0)  # from Userlog
+    total_logs = db.Column(db.Integer, nullable=False, default=0)
+
+class UserWasteStat(db.Model):
+    """Wasted item count per user for one category or reason value."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    dimension = db.Column(db.String(20), nullable=False)  # "category" or "reason"
+    value = db.Column(db.String(100), nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "dimension", "value", name="uq_user_waste_stat"),
+    )
+
+class UserDataVersion(db.Model):
+    """Per-user counter bumped by every write to that user's data (see cache.py)."""
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    # Bumped only by changes to logs dated before today (see trends.py)
+    history_version = db.Column(db.Integer, default=0)
+
+class Tombstone(db.Model):
+    """A deleted Food, Category, Userlog or DonationOffer, reported by /api/sync (see sync.py)."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    entity = db.Column(db.String(20), nullable=False)  # a key of sync.SYNC_ENTITIES
+    entity_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sync_version = db.Column(db.Integer)
+
+    __table_args__ = (
+        db.Index("ix_tombstone_user_deleted", "user_id", "deleted_at"),
+        db.Index("ix_tombstone_user_sync_version", "user_id", "sync_version"),
+    )
+
+class CatalogVersion(db.Model):
+    """Version counter for shared data cached in-process, e.g. "donation_centers"."""
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class ExpiryAlert(db.Model):
+    """Current expiry alert of an AVAILABLE food item, maintained by expiry.py.
+
+    state is NEAR_EXPIRY (1-3 days left), EXPIRES_TODAY or EXPIRED.
+    """
+    food_id = db.Column(db.Integer, db.ForeignKey("food.id", ondelete="CASCADE"), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    state = db.Column(db.String(20), nullable=False)
+    expiry_date = db.Column(db.Date, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index("ix_expiry_alert_user_expiry", "user_id", "expiry_date"),
+    )
@@ -0,0 +1,122 @@
+import json
+import logging
+import queue
+import select
+import threading
+import time
+import uuid
+
+from sqlalchemy import text
+
+from events import deliver, set_relay
+
+logger = logging.getLogger(__name__)
+
+RELAY_CHANNEL = "app_events"
+# Seconds between checks of the stop flag while no notification arrives
+POLL_SECONDS = 5
+RECONNECT_SECONDS = 5
+# Events waiting to be sent; beyond this new ones are dropped, not blocked on
+MAX_PENDING_EVENTS = 10000
+# Notifications sent per transaction
+SEND_BATCH_SIZE = 500
+
+
+class PostgresRelay:
+    """Forwards published events to the other worker processes over LISTEN/NOTIFY.
+
+    Each worker keeps one listening connection and delivers what other
+    workers publish to its own subscribers, so an /api/stream client gets
+    every event whichever worker handled the write. Its own notifications
+    are skipped, since publish() already delivered them locally.
+
+    send() only queues the event; a sender thread drains the queue and
+    sends whatever has accumulated in one transaction, so a commit that
+    publishes hundreds of events costs the request nothing.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.origin = uuid.uuid4().hex
+        self.outbox = queue.Queue(maxsize=MAX_PENDING_EVENTS)
+        self.threads = []
+        self.stopped = False
+
+    def start(self):
+        for target, name in ((self.run, "event-relay"), (self.run_sender, "event-relay-sender")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        self.stopped = True
+
+    def send(self, topic, payload):
+        message = json.dumps({"origin": self.origin, "topic": topic, "payload": payload}, default=str)
+        try:
+            self.outbox.put_nowait(message)
+        except queue.Full:
+            logger.warning("Event relay queue full; dropped %s event", topic)
+
+    def next_batch(self):
+        """Block until an event is queued, then take up to SEND_BATCH_SIZE of them."""
+        messages = [self.outbox.get()]
+        while len(messages) < SEND_BATCH_SIZE:
+            try:
+                messages.append(self.outbox.get_nowait())
+            except queue.Empty:
+                break
+        return messages
+
+    def run_sender(self):
+        notify = text("SELECT pg_notify(:channel, :message)")
+        while not self.stopped:
+            messages = self.next_batch()
+            try:
+                with self.engine.begin() as connection:
+                    for message in messages:
+                        connection.execute(notify, {"channel": RELAY_CHANNEL, "message": message})
+            except Exception:
+                logger.exception("Failed to relay %d event(s)", len(messages))
+
+    def receive(self, message):
+        event = json.loads(message)
+        if event["origin"] != self.origin:
+            deliver(event["topic"], event["payload"])
+
+    def listen(self):
+        connection = self.engine.raw_connection()
+        try:
+            dbapi_connection = connection.driver_connection
+            dbapi_connection.autocommit = True
+            with dbapi_connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {RELAY_CHANNEL}")
+            while not self.stopped:
+                if not select.select([dbapi_connection], [], [], POLL_SECONDS)[0]:
+                    continue
+                dbapi_connection.poll()
+                while dbapi_connection.notifies:
+                    self.receive(dbapi_connection.notifies.pop(0).payload)
+        finally:
+            connection.invalidate()
+
+    def run(self):
+        while not self.stopped:
+            try:
+                self.listen()
+            except Exception:
+                logger.exception("Event relay connection lost")
+                time.sleep(RECONNECT_SECONDS)
+
+
+relay = None
+
+
+def start_event_relay(engine):
+    """Relay events between workers; only PostgreSQL has a channel for it."""
+    global relay
+    if relay is None and engine.dialect.name == "postgresql":
+        relay = PostgresRelay(engine)
+        set_relay(relay)
+        relay.start()
+    return relay
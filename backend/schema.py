@@ -0,0 +1,113 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateTable
+
+from models import db, Food, FoodArchive
+from search import ensure_search_index
+
+
+def add_missing_columns():
+    """Add nullable columns introduced after a table was first created.
+
+    create_all() never alters existing tables; this covers the additive
+    changes the models make without a migration tool.
+    """
+    inspector = inspect(db.engine)
+    preparer = db.engine.dialect.identifier_preparer
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                connection.execute(text(
+                    f"ALTER TABLE {preparer.format_table(table)} "
+                    f"ADD COLUMN {preparer.format_column(column)} {column_type}"
+                ))
+
+
+def drop_archived_food_foreign_keys():
+    """Drop the foreign keys from food_id columns that may refer to archived items.
+
+    Userlog and DonationOfferItem keep pointing at items moved to
+    food_archive (see archive.py). SQLite does not enforce them here and
+    cannot drop constraints, so it is left alone.
+    """
+    if db.engine.dialect.name == "sqlite":
+        return
+    inspector = inspect(db.engine)
+    preparer = db.engine.dialect.identifier_preparer
+    with db.engine.begin() as connection:
+        for table_name in ("userlog", "donation_offer_item"):
+            if not inspector.has_table(table_name):
+                continue
+            for foreign_key in inspector.get_foreign_keys(table_name):
+                if foreign_key["referred_table"] == "food" and foreign_key["name"]:
+                    connection.execute(text(
+                        f"ALTER TABLE {preparer.quote(table_name)} "
+                        f"DROP CONSTRAINT {preparer.quote(foreign_key['name'])}"
+                    ))
+
+
+def enable_food_autoincrement():
+    """Stop SQLite from handing out the ids of archived food items again.
+
+    Without AUTOINCREMENT, SQLite reuses the highest id once that row is
+    deleted, and archived items keep their ids in food_archive (see
+    archive.py). Rebuilds a food table created before Food declared
+    sqlite_autoincrement, then makes sure its sequence is past every
+    archived id. Other databases never reuse ids.
+    """
+    if db.engine.dialect.name != "sqlite":
+        return
+    food = Food.__table__
+    preparer = db.engine.dialect.identifier_preparer
+    table_name = preparer.format_table(food)
+    with db.engine.begin() as connection:
+        sql = connection.execute(
+            text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": food.name}
+        ).scalar()
+        if sql is None:
+            return
+        if "AUTOINCREMENT" not in sql.upper():
+            # SQLite cannot alter a primary key in place. Indexes go with
+            # the old table and are recreated by init_schema().
+            ddl = str(CreateTable(food).compile(dialect=db.engine.dialect))
+            connection.execute(text("DROP TABLE IF EXISTS food_rebuild"))
+            connection.execute(text(ddl.replace(f"CREATE TABLE {table_name}", "CREATE TABLE food_rebuild", 1)))
+            columns = ", ".join(preparer.format_column(column) for column in food.columns)
+            connection.execute(text(f"INSERT INTO food_rebuild ({columns}) SELECT {columns} FROM {table_name}"))
+            connection.execute(text(f"DROP TABLE {table_name}"))
+            connection.execute(text(f"ALTER TABLE food_rebuild RENAME TO {table_name}"))
+
+        archived = connection.execute(
+            text(f"SELECT MAX(id) FROM {preparer.format_table(FoodArchive.__table__)}")
+        ).scalar()
+        if archived is None:
+            return
+        sequence = connection.execute(
+            text("SELECT seq FROM sqlite_sequence WHERE name = :name"), {"name": food.name}
+        ).scalar()
+        if sequence is None:
+            connection.execute(
+                text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)"), {"name": food.name, "seq": archived}
+            )
+        elif sequence < archived:
+            connection.execute(
+                text("UPDATE sqlite_sequence SET seq = :seq WHERE name = :name"), {"name": food.name, "seq": archived}
+            )
+
+
+def init_schema():
+    """Create tables, upgrade existing ones and build secondary indexes."""
+    db.create_all()
+    add_missing_columns()
+    drop_archived_food_foreign_keys()
+    enable_food_autoincrement()
+    # create_all() only adds indexes along with new tables
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+    ensure_search_index()
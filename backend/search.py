@@ -0,0 +1,128 @@
+import re
+
+from sqlalchemy import column, func, literal_column, or_, select, table, text
+
+from models import db, DonationCenter, DonationCenterTag
+
+FTS_TABLE = "donation_center_fts"
+
+SQLITE_FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE}
+        USING fts5(name, city, address, content='donation_center', content_rowid='id')""",
+    f"""CREATE TRIGGER IF NOT EXISTS donation_center_fts_ai AFTER INSERT ON donation_center BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, city, address) VALUES (new.id, new.name, new.city, new.address);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS donation_center_fts_ad AFTER DELETE ON donation_center BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, city, address)
+        VALUES ('delete', old.id, old.name, old.city, old.address);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS donation_center_fts_au AFTER UPDATE ON donation_center BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, city, address)
+        VALUES ('delete', old.id, old.name, old.city, old.address);
+        INSERT INTO {FTS_TABLE}(rowid, name, city, address) VALUES (new.id, new.name, new.city, new.address);
+    END""",
+]
+
+# Must match the expression used by search_centers() for the index to apply
+POSTGRES_TSVECTOR = (
+    "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(city, '') || ' ' || coalesce(address, ''))"
+)
+POSTGRES_FTS_DDL = [
+    f"CREATE INDEX IF NOT EXISTS ix_donation_center_fts ON donation_center USING GIN ({POSTGRES_TSVECTOR})",
+]
+
+
+def parse_tags(accepts_items):
+    """Split a comma-separated accepts_items string into unique lowercase tags."""
+    tags = []
+    for tag in (accepts_items or "").split(","):
+        tag = tag.strip().lower()[:30]
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def set_center_tags(center):
+    """Replace the center's tag rows to match its accepts_items."""
+    center.tags = [DonationCenterTag(tag=tag) for tag in parse_tags(center.accepts_items)]
+
+
+def fts_backend():
+    dialect = db.engine.dialect.name
+    return dialect if dialect in ("sqlite", "postgresql") else None
+
+
+def ensure_search_index():
+    """Create the full-text index and its sync triggers if they are missing.
+
+    A newly created SQLite FTS table is populated from the existing rows.
+    """
+    backend = fts_backend()
+    with db.engine.begin() as connection:
+        if backend == "sqlite":
+            exists = connection.execute(
+                text("SELECT 1 FROM sqlite_master WHERE name = :name"), {"name": FTS_TABLE}
+            ).first()
+            for statement in SQLITE_FTS_DDL:
+                connection.execute(text(statement))
+            if not exists:
+                connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        elif backend == "postgresql":
+            for statement in POSTGRES_FTS_DDL:
+                connection.execute(text(statement))
+
+
+def reindex_centers():
+    """Rebuild tag rows for every center and the SQLite FTS table."""
+    for center in DonationCenter.query.all():
+        set_center_tags(center)
+    db.session.commit()
+    if fts_backend() == "sqlite":
+        db.session.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        db.session.commit()
+
+
+def search_terms(q):
+    return re.findall(r"\w+", q or "")
+
+
+def search_centers(q=None, tags=None, limit=50):
+    """Centers matching every word of q (prefix match) and accepting every tag.
+
+    Results are ranked by full-text relevance when q is given, otherwise
+    ordered by name.
+    """
+    query = DonationCenter.query
+    terms = search_terms(q)
+    backend = fts_backend()
+
+    if terms and backend == "sqlite":
+        fts = table(FTS_TABLE, column("rowid"), column("rank"))
+        matches = (
+            select(fts.c.rowid.label("id"), fts.c.rank.label("rank"))
+            .where(literal_column(FTS_TABLE).op("MATCH")(" ".join(f'"{term}"*' for term in terms)))
+            .subquery()
+        )
+        query = query.join(matches, matches.c.id == DonationCenter.id).order_by(matches.c.rank)
+    elif terms and backend == "postgresql":
+        tsvector = literal_column(POSTGRES_TSVECTOR)
+        tsquery = func.to_tsquery("simple", " & ".join(f"{term}:*" for term in terms))
+        query = query.filter(tsvector.op("@@")(tsquery)).order_by(func.ts_rank(tsvector, tsquery).desc())
+    elif terms:
+        for term in terms:
+            pattern = f"%{term}%"
+            query = query.filter(or_(
+                DonationCenter.name.ilike(pattern),
+                DonationCenter.city.ilike(pattern),
+                DonationCenter.address.ilike(pattern)
+            ))
+
+    for tag in tags or []:
+        query = query.filter(DonationCenter.id.in_(
+            select(DonationCenterTag.center_id).where(DonationCenterTag.tag == tag)
+        ))
+
+    if not terms:
+        query = query.order_by(DonationCenter.name)
+
+    return query.order_by(DonationCenter.id).limit(limit).all()
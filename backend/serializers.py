@@ -0,0 +1,218 @@
+from datetime import date, datetime
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import func
+
+from models import db, Category, DonationCenter, DonationOffer, DonationOfferItem, Food, FoodArchive, Userlog
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder is used instead
+    orjson = None
+
+
+class Schema:
+    """Response fields mapped to the columns they are read from, in order.
+
+    Selecting `schema.columns` returns plain row tuples, which `dump` zips
+    into dicts without building ORM objects. `dump_object` serializes an
+    already-loaded instance with the same field names.
+    """
+
+    def __init__(self, **fields):
+        self.fields = fields
+        self.names = tuple(fields)
+        self.columns = list(fields.values())
+
+    def only(self, *names):
+        return Schema(**{name: self.fields[name] for name in names})
+
+    def extend(self, **fields):
+        return Schema(**self.fields, **fields)
+
+    def sparse(self, fields, required=()):
+        """The part of this schema needed for `fields` (None means all) and `required`."""
+        if fields is None:
+            return self
+        return self.only(*(name for name in self.names if name in fields or name in required))
+
+    def dump(self, row):
+        return dict(zip(self.names, row))
+
+    def dump_all(self, rows):
+        names = self.names
+        return [dict(zip(names, row)) for row in rows]
+
+    def dump_object(self, obj):
+        return {name: getattr(obj, column.key) for name, column in self.fields.items()}
+
+
+def parse_fields(value, names):
+    """Names from a comma-separated `fields` parameter, in the order of `names`.
+
+    Returns None when the parameter is absent, meaning every field.
+    """
+    if value is None:
+        return None
+    requested = {name.strip() for name in value.split(",") if name.strip()}
+    if not requested:
+        raise ValueError("fields must name at least one field")
+    unknown = requested.difference(names)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}. Available: {', '.join(names)}")
+    return [name for name in names if name in requested]
+
+
+def trim(items, fields):
+    """Drop the keys of each dict that are not in `fields` (None keeps them all)."""
+    if fields is None:
+        return items
+    return [{name: item[name] for name in fields} for item in items]
+
+
+FOOD = Schema(
+    id=Food.id,
+    name=Food.name,
+    category=Food.category,
+    quantity=Food.quantity,
+    unit=Food.unit,
+    purchase_date=Food.purchase_date,
+    expiry_date=Food.expiry_date,
+    storage_location=Food.storage_location,
+    status=Food.status,
+    reason_of_waste=Food.reason_of_waste,
+    created_at=Food.created_at
+)
+# Inventory listing (/api/food) and expiry alert entries
+FOOD_ITEM = FOOD.only("id", "name", "category", "quantity", "unit", "expiry_date", "status")
+FOOD_ALERT = FOOD.only("id", "name", "category", "expiry_date")
+# Added to food dicts from expiry_state_expr and days_until
+FOOD_COMPUTED = ("expiry_state", "days_left")
+
+CATEGORY = Schema(id=Category.id, name=Category.name)
+
+
+def join_food(query, food_id):
+    """Outer-join Food and FoodArchive on `food_id`, for a food_name field."""
+    return (
+        query.outerjoin(Food, Food.id == food_id)
+        .outerjoin(FoodArchive, FoodArchive.id == food_id)
+    )
+
+
+# The referenced item may be hot or archived; None once it is deleted
+FOOD_NAME = func.coalesce(Food.name, FoodArchive.name).label("food_name")
+
+# Callers join_food on Userlog.food_id
+FOOD_LOG = Schema(
+    id=Userlog.id,
+    food_id=Userlog.food_id,
+    food_name=FOOD_NAME,
+    action=Userlog.action,
+    quantity=Userlog.quantity,
+    action_date=Userlog.action_date,
+    reason=Userlog.reason,
+    remarks=Userlog.remarks
+)
+
+DONATION_CENTER = Schema(
+    id=DonationCenter.id,
+    name=DonationCenter.name,
+    city=DonationCenter.city,
+    address=DonationCenter.address,
+    phone=DonationCenter.phone,
+    email=DonationCenter.email,
+    accepts_items=DonationCenter.accepts_items,
+    open_hours=DonationCenter.open_hours,
+    latitude=DonationCenter.latitude,
+    longitude=DonationCenter.longitude
+)
+DONATION_CENTER_DETAIL = DONATION_CENTER.extend(created_at=DonationCenter.created_at)
+
+# Callers outer-join DonationCenter on DonationOffer.donation_center_id
+DONATION_OFFER = Schema(
+    id=DonationOffer.id,
+    donation_center_id=DonationOffer.donation_center_id,
+    donation_center_name=DonationCenter.name.label("donation_center_name"),
+    status=DonationOffer.status,
+    remarks=DonationOffer.remarks,
+    created_at=DonationOffer.created_at
+)
+# Callers join_food on DonationOfferItem.food_id
+DONATION_OFFER_ITEM = Schema(
+    id=DonationOfferItem.id,
+    food_id=DonationOfferItem.food_id,
+    food_name=FOOD_NAME,
+    quantity=DonationOfferItem.quantity
+)
+
+
+def offer_items(offer_ids):
+    """DONATION_OFFER_ITEM dicts of the given offers, keyed by offer id."""
+    items = {offer_id: [] for offer_id in offer_ids}
+    if not offer_ids:
+        return items
+    query = db.session.query(DonationOfferItem.donation_offer_id, *DONATION_OFFER_ITEM.columns)
+    rows = (
+        join_food(query, DonationOfferItem.food_id)
+        .filter(DonationOfferItem.donation_offer_id.in_(offer_ids))
+        .order_by(DonationOfferItem.id)
+        .all()
+    )
+    for row in rows:
+        items[row[0]].append(DONATION_OFFER_ITEM.dump(row[1:]))
+    return items
+
+
+class ISOJSONProvider(DefaultJSONProvider):
+    """The stdlib encoder, writing dates and datetimes as ISO 8601.
+
+    Flask's default renders them as HTTP dates
+    ("Wed, 01 Jan 2025 00:00:00 GMT"), which clients cannot compare or
+    sort without parsing.
+    """
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, (date, datetime)):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+
+class OrjsonProvider(ISOJSONProvider):
+    """orjson-backed provider; it encodes dates natively, in the same ISO format."""
+
+    def _options(self, indent=False):
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        # Formatting options orjson lacks fall back to the stdlib encoder
+        if set(kwargs) - {"default", "sort_keys"}:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode()
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=self.default, option=self._options(indent))
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+
+JSON_PROVIDERS = {"json": ISOJSONProvider, "orjson": OrjsonProvider}
+
+
+def json_provider(app):
+    """The provider named by JSON_PROVIDER; "auto" prefers orjson when installed."""
+    name = app.config["JSON_PROVIDER"]
+    if name == "auto":
+        name = "orjson" if orjson is not None else "json"
+    if name not in JSON_PROVIDERS:
+        raise ValueError(f"Unknown JSON_PROVIDER: {name}")
+    if name == "orjson" and orjson is None:
+        raise ValueError("JSON_PROVIDER is orjson but orjson is not installed")
+    return JSON_PROVIDERS[name](app)
@@ -0,0 +1,211 @@
+from collections import defaultdict
+
+from sqlalchemy import delete, event, func, inspect, insert, select, update
+
+from models import db, Food, FoodArchive, User, Userlog, UserlogDaily, UserStats, UserWasteStat
+
+STATUSES = ["AVAILABLE", "USED", "DONATED", "WASTED"]
+LOG_ACTIONS = ["USED", "DONATED", "WASTED"]
+
+FOOD_FIELDS = ["user_id", "status", "quantity", "category", "reason_of_waste"]
+LOG_FIELDS = ["user_id", "action", "quantity"]
+
+
+class StatDelta:
+    """Counter changes for one user, accumulated over a flush."""
+
+    def __init__(self):
+        self.counters = defaultdict(float)
+        self.waste = defaultdict(int)
+
+    def add_food(self, snapshot, sign):
+        status = snapshot["status"] or "AVAILABLE"
+        self.counters["total_items"] += sign
+        if status in STATUSES:
+            self.counters[f"{status.lower()}_count"] += sign
+        if status == "AVAILABLE":
+            self.counters["available_quantity"] += sign * (snapshot["quantity"] or 0)
+        if status == "WASTED":
+            self.waste[("category", snapshot["category"] or "Unknown")] += sign
+            if snapshot["reason_of_waste"]:
+                self.waste[("reason", snapshot["reason_of_waste"])] += sign
+
+    def add_log(self, snapshot, sign):
+        self.counters["total_logs"] += sign
+        if snapshot["action"] in LOG_ACTIONS:
+            self.counters[f"{snapshot['action'].lower()}_quantity"] += sign * (snapshot["quantity"] or 0)
+
+
+def _snapshot(obj, fields, old=False):
+    """Current (or pre-flush, when old=True) values of the given attributes."""
+    state = inspect(obj)
+    values = {}
+    for field in fields:
+        value = getattr(obj, field)
+        if old:
+            history = state.attrs[field].history
+            if history.deleted:
+                value = history.deleted[0]
+        values[field] = value
+    return values
+
+
+def _user_key(user_id):
+    return int(user_id) if user_id is not None else None
+
+
+def collect_deltas(session):
+    """Map user_id -> StatDelta for every Food/Userlog change in this flush."""
+    deltas = defaultdict(StatDelta)
+
+    for obj in session.new:
+        if isinstance(obj, Food):
+            snapshot = _snapshot(obj, FOOD_FIELDS)
+            deltas[_user_key(snapshot["user_id"])].add_food(snapshot, 1)
+        elif isinstance(obj, Userlog):
+            snapshot = _snapshot(obj, LOG_FIELDS)
+            deltas[_user_key(snapshot["user_id"])].add_log(snapshot, 1)
+
+    for obj in session.dirty:
+        if isinstance(obj, Food) and session.is_modified(obj):
+            old, new = _snapshot(obj, FOOD_FIELDS, old=True), _snapshot(obj, FOOD_FIELDS)
+            deltas[_user_key(old["user_id"])].add_food(old, -1)
+            deltas[_user_key(new["user_id"])].add_food(new, 1)
+        elif isinstance(obj, Userlog) and session.is_modified(obj):
+            old, new = _snapshot(obj, LOG_FIELDS, old=True), _snapshot(obj, LOG_FIELDS)
+            deltas[_user_key(old["user_id"])].add_log(old, -1)
+            deltas[_user_key(new["user_id"])].add_log(new, 1)
+
+    for obj in session.deleted:
+        if isinstance(obj, Food):
+            snapshot = _snapshot(obj, FOOD_FIELDS, old=True)
+            deltas[_user_key(snapshot["user_id"])].add_food(snapshot, -1)
+        elif isinstance(obj, Userlog):
+            snapshot = _snapshot(obj, LOG_FIELDS, old=True)
+            deltas[_user_key(snapshot["user_id"])].add_log(snapshot, -1)
+
+    deltas.pop(None, None)
+    return deltas
+
+
+def apply_deltas(connection, deltas):
+    """Apply counter deltas with relative UPDATEs so concurrent writers don't race.
+
+    A user without a rollup row yet gets a full rebuild instead; that sees
+    the current transaction, so it already includes this change.
+    """
+    for user_id, delta in deltas.items():
+        counters = {name: value for name, value in delta.counters.items() if value}
+        if counters:
+            values = {name: getattr(UserStats, name) + value for name, value in counters.items()}
+            result = connection.execute(
+                update(UserStats).where(UserStats.user_id == user_id).values(**values)
+            )
+            if result.rowcount == 0:
+                rebuild_user_stats(connection, user_id)
+                continue
+
+        for (dimension, value), count in delta.waste.items():
+            if not count:
+                continue
+            result = connection.execute(
+                update(UserWasteStat)
+                .where(
+                    UserWasteStat.user_id == user_id,
+                    UserWasteStat.dimension == dimension,
+                    UserWasteStat.value == value
+                )
+                .values(count=UserWasteStat.count + count)
+            )
+            if result.rowcount == 0 and count > 0:
+                connection.execute(insert(UserWasteStat).values(
+                    user_id=user_id, dimension=dimension, value=value, count=count
+                ))
+
+
+@event.listens_for(db.session, "after_flush")
+def _maintain_user_stats(session, flush_context):
+    deltas = collect_deltas(session)
+    connection = session.connection()
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            drop_user_stats(connection, obj.id)
+            deltas.pop(obj.id, None)
+    if deltas:
+        apply_deltas(connection, deltas)
+
+
+def drop_user_stats(connection, user_id):
+    connection.execute(delete(UserWasteStat).where(UserWasteStat.user_id == user_id))
+    connection.execute(delete(UserStats).where(UserStats.user_id == user_id))
+
+
+def rebuild_user_stats(connection, user_id):
+    """Recompute one user's rollup from the Food, FoodArchive, Userlog and UserlogDaily tables."""
+    drop_user_stats(connection, user_id)
+
+    delta = StatDelta()
+    # Archived items still count; only their storage moved
+    for model in (Food, FoodArchive):
+        food_rows = connection.execute(
+            select(model.status, model.category, model.reason_of_waste,
+                   func.count(model.id), func.coalesce(func.sum(model.quantity), 0))
+            .where(model.user_id == user_id)
+            .group_by(model.status, model.category, model.reason_of_waste)
+        )
+        for status, category, reason, count, quantity in food_rows:
+            snapshot = {"status": status, "category": category, "reason_of_waste": reason, "quantity": 0}
+            delta.add_food(snapshot, count)
+            if (status or "AVAILABLE") == "AVAILABLE":
+                delta.counters["available_quantity"] += quantity
+
+    # Compacted logs still count; their totals moved to UserlogDaily
+    log_rows = list(connection.execute(
+        select(Userlog.action, func.count(Userlog.id), func.coalesce(func.sum(Userlog.quantity), 0))
+        .where(Userlog.user_id == user_id)
+        .group_by(Userlog.action)
+    ))
+    log_rows += connection.execute(
+        select(UserlogDaily.action, func.sum(UserlogDaily.count), func.sum(UserlogDaily.quantity))
+        .where(UserlogDaily.user_id == user_id)
+        .group_by(UserlogDaily.action)
+    )
+    for action, count, quantity in log_rows:
+        delta.add_log({"action": action, "quantity": 0}, count)
+        if action in LOG_ACTIONS:
+            delta.counters[f"{action.lower()}_quantity"] += quantity
+
+    counters = {column.name: 0 for column in UserStats.__table__.columns if column.name != "user_id"}
+    counters.update(delta.counters)
+    connection.execute(insert(UserStats).values(user_id=user_id, **counters))
+    for (dimension, value), count in delta.waste.items():
+        if count:
+            connection.execute(insert(UserWasteStat).values(
+                user_id=user_id, dimension=dimension, value=value, count=count
+            ))
+
+
+def rebuild_all_stats(connection):
+    user_ids = connection.execute(select(User.id)).scalars().all()
+    for user_id in user_ids:
+        rebuild_user_stats(connection, user_id)
+    return user_ids
+
+
+def get_user_stats(user_id):
+    """Load the rollup for a user, building it on first access."""
+    user_id = int(user_id)
+    stats = db.session.get(UserStats, user_id)
+    if stats is None:
+        rebuild_user_stats(db.session.connection(), user_id)
+        db.session.commit()
+        stats = db.session.get(UserStats, user_id)
+
+    waste = {"category": {}, "reason": {}}
+    rows = UserWasteStat.query.filter(
+        UserWasteStat.user_id == user_id,
+        UserWasteStat.count > 0
+    )
+    for row in rows:
+        waste[row.dimension][row.value] = row.count
+    return stats, waste
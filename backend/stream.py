@@ -0,0 +1,155 @@
+import json
+import queue
+import threading
+import time
+
+from sqlalchemy import event, inspect
+
+from events import publish, subscribe
+from expiry import TRANSITION_TOPIC
+from models import db, DonationOffer, Food
+
+INVENTORY_TOPIC = "inventory.changed"
+OFFER_TOPIC = "offer.status"
+
+# Events a single connection may fall behind by before it is reset
+MAX_PENDING_EVENTS = 100
+HEARTBEAT_SECONDS = 15
+# Clients are asked to reconnect this often so dead sockets get reaped
+MAX_STREAM_SECONDS = 30 * 60
+RETRY_MILLISECONDS = 5000
+
+
+class Subscriber:
+    def __init__(self):
+        self.queue = queue.Queue(maxsize=MAX_PENDING_EVENTS)
+        self.overflowed = False
+
+    def offer(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            self.overflowed = True
+
+
+class Broker:
+    """Fans published events out to the open streams of their user.
+
+    Publishing never blocks: a connection that stops reading fills its
+    bounded queue and is reset, and the client refetches over REST when it
+    reconnects.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def open(self, user_id):
+        subscriber = Subscriber()
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscriber)
+        return subscriber
+
+    def close(self, user_id, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[user_id]
+
+    def connection_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def send(self, user_id, event_name, data):
+        if user_id is None:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers.get(int(user_id), ()))
+        if not subscribers:
+            return
+        message = format_event(event_name, data)
+        for subscriber in subscribers:
+            subscriber.offer(message)
+
+
+broker = Broker()
+
+
+def format_event(event_name, data):
+    payload = json.dumps(data, default=str, separators=(",", ":"))
+    return f"event: {event_name}\ndata: {payload}\n\n"
+
+
+def event_stream(user_id, heartbeat=HEARTBEAT_SECONDS, max_seconds=MAX_STREAM_SECONDS):
+    """Yield SSE messages for one connection until it closes or times out.
+
+    Takes no request context or database connection, so an idle stream
+    only holds a queue wait. Under a gevent worker that wait is a
+    greenlet, not an OS thread.
+    """
+    subscriber = broker.open(user_id)
+    deadline = time.monotonic() + max_seconds
+    try:
+        yield f"retry: {RETRY_MILLISECONDS}\n" + format_event("ready", {"user_id": user_id})
+        while time.monotonic() < deadline:
+            if subscriber.overflowed:
+                yield format_event("reset", {"reason": "too many pending events"})
+                return
+            try:
+                yield subscriber.queue.get(timeout=heartbeat)
+            except queue.Empty:
+                yield ": heartbeat\n\n"
+    finally:
+        broker.close(user_id, subscriber)
+
+
+subscribe(TRANSITION_TOPIC, lambda payload: broker.send(payload["user_id"], "expiry", payload))
+subscribe(INVENTORY_TOPIC, lambda payload: broker.send(payload["user_id"], "inventory", payload))
+subscribe(OFFER_TOPIC, lambda payload: broker.send(payload["user_id"], "offer", payload))
+
+
+def _pending(session):
+    return session.info.setdefault("stream_pending", [])
+
+
+@event.listens_for(db.session, "after_flush")
+def _collect_changes(session, flush_context):
+    changes = [(obj, "created") for obj in session.new]
+    changes += [(obj, "updated") for obj in session.dirty if session.is_modified(obj)]
+    changes += [(obj, "deleted") for obj in session.deleted]
+    for obj, action in changes:
+        if not isinstance(obj, (Food, DonationOffer)) or obj.user_id is None:
+            continue
+        if isinstance(obj, Food):
+            _pending(session).append((INVENTORY_TOPIC, {
+                "user_id": int(obj.user_id),
+                "action": action,
+                "food_id": obj.id,
+                "status": obj.status,
+                "quantity": obj.quantity
+            }))
+        elif action != "updated" or inspect(obj).attrs.status.history.has_changes():
+            _pending(session).append((OFFER_TOPIC, {
+                "user_id": int(obj.user_id),
+                "action": action,
+                "offer_id": obj.id,
+                "status": obj.status
+            }))
+
+
+def inventory_imported(session, user_id, count):
+    """Announce rows added by Core INSERTs, which the flush hook never sees."""
+    _pending(session).append((INVENTORY_TOPIC, {"user_id": user_id, "action": "imported", "count": count}))
+
+
+@event.listens_for(db.session, "after_commit")
+def _publish_on_commit(session):
+    for topic, payload in session.info.pop("stream_pending", []):
+        publish(topic, payload)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop("stream_pending", None)
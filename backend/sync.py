@@ -0,0 +1,152 @@
+import base64
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, event, insert, select
+
+from cache import bump_data_versions
+from models import db, Category, DonationCenter, DonationOffer, Food, Tombstone, Userlog, UserDataVersion
+from serializers import CATEGORY, DONATION_OFFER, FOOD, FOOD_LOG, offer_items
+
+# Tombstones older than this are pruned; older cursors get a full sync
+TOMBSTONE_RETENTION_DAYS = 30
+
+# Response key: (model, schema). Food logs leave out the food's name,
+# since clients hold the food rows themselves.
+SYNC_ENTITIES = {
+    "food": (Food, FOOD.extend(updated_at=Food.updated_at)),
+    "categories": (Category, CATEGORY.extend(updated_at=Category.updated_at)),
+    "food_logs": (Userlog, FOOD_LOG.only(
+        "id", "food_id", "action", "quantity", "action_date", "reason", "remarks"
+    ).extend(updated_at=Userlog.updated_at)),
+    "donation_offers": (DonationOffer, DONATION_OFFER.extend(updated_at=DonationOffer.updated_at)),
+}
+ENTITY_NAMES = {model: name for name, (model, _) in SYNC_ENTITIES.items()}
+
+
+def stamp_sync_versions(connection, user_ids):
+    """Bump the users' data versions and return {user_id: new version}.
+
+    Synced rows and tombstones written in the same transaction are stamped
+    with the returned version. The bump locks each UserDataVersion row
+    until commit, so a later writer for the same user always stamps a
+    higher version and versions follow commit order per user.
+    """
+    user_ids = sorted(set(user_ids))
+    bump_data_versions(connection, user_ids)
+    return dict(connection.execute(
+        select(UserDataVersion.user_id, UserDataVersion.version).where(UserDataVersion.user_id.in_(user_ids))
+    ).all())
+
+
+def encode_sync_cursor(version, issued_at):
+    raw = f"{version}@{issued_at.isoformat()}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_sync_cursor(cursor):
+    """Return (version, issued_at), or None for a cursor from before versioned sync."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded).decode()
+        if "@" not in raw:
+            # Clock-based cursors: the client falls back to a full sync
+            datetime.fromisoformat(raw)
+            return None
+        version, issued_at = raw.split("@", 1)
+        return int(version), datetime.fromisoformat(issued_at)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+
+def _changed_rows(user_id, model, schema, since):
+    query = db.session.query(*schema.columns).select_from(model).filter(model.user_id == user_id)
+    if model is DonationOffer:
+        query = query.outerjoin(DonationCenter, DonationCenter.id == DonationOffer.donation_center_id)
+    if since is not None:
+        # Range scan on the (user_id, sync_version) index
+        query = query.filter(model.sync_version > since).order_by(model.sync_version, model.id)
+    else:
+        query = query.order_by(model.id)
+    return schema.dump_all(query.all())
+
+
+def changes_since(user_id, since=None, now=None):
+    """Rows of the user's synced tables created, changed or deleted since `since`.
+
+    `since` is a decoded (version, issued_at) cursor. Without it, or when
+    it was issued before the tombstone retention window, every row is
+    returned with "full": true and the client should replace its copy.
+    Otherwise clients apply "deleted" before "changes".
+    """
+    now = now or datetime.utcnow()
+    # Read before the rows: anything committed later is stamped higher
+    # and comes with the next sync, at worst a second time
+    version = db.session.query(UserDataVersion.version).filter(UserDataVersion.user_id == user_id).scalar() or 0
+    full = since is None or since[1] < now - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+    since = None if full else since[0]
+
+    changes = {
+        name: _changed_rows(user_id, model, schema, since)
+        for name, (model, schema) in SYNC_ENTITIES.items()
+    }
+    items = offer_items([offer["id"] for offer in changes["donation_offers"]])
+    for offer in changes["donation_offers"]:
+        offer["items"] = items[offer["id"]]
+
+    deleted = {name: [] for name in SYNC_ENTITIES}
+    if since is not None:
+        tombstones = (
+            db.session.query(Tombstone.entity, Tombstone.entity_id)
+            .filter(Tombstone.user_id == user_id, Tombstone.sync_version > since)
+            .order_by(Tombstone.sync_version, Tombstone.id)
+        )
+        for entity, entity_id in tombstones:
+            deleted[entity].append(entity_id)
+
+    return {
+        "full": full,
+        "changes": changes,
+        "deleted": deleted,
+        "cursor": encode_sync_cursor(version, now)
+    }
+
+
+def prune_tombstones(connection, now=None):
+    """Delete tombstones past the retention window; returns how many."""
+    cutoff = (now or datetime.utcnow()) - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+    return connection.execute(delete(Tombstone).where(Tombstone.deleted_at < cutoff)).rowcount
+
+
+@event.listens_for(db.session, "before_flush")
+def _stamp_versions(session, flush_context, instances):
+    session.info.pop("sync_versions", None)
+    dirty = [obj for obj in session.dirty if session.is_modified(obj)]
+    objs = [
+        obj for obj in list(session.new) + list(session.deleted) + dirty
+        if type(obj) in ENTITY_NAMES and obj.user_id is not None
+    ]
+    if not objs:
+        return
+    versions = stamp_sync_versions(session.connection(), {int(obj.user_id) for obj in objs})
+    session.info["sync_versions"] = versions
+    for obj in objs:
+        if obj not in session.deleted:
+            obj.sync_version = versions[int(obj.user_id)]
+
+
+@event.listens_for(db.session, "after_flush")
+def _record_deletions(session, flush_context):
+    now = datetime.utcnow()
+    deleted = [obj for obj in session.deleted if type(obj) in ENTITY_NAMES and obj.user_id is not None]
+    if not deleted:
+        return
+    versions = session.info.get("sync_versions", {})
+    # Deletes cascaded during the flush were not stamped beforehand
+    missing = {int(obj.user_id) for obj in deleted} - versions.keys()
+    if missing:
+        versions = {**versions, **stamp_sync_versions(session.connection(), missing)}
+    session.connection().execute(insert(Tombstone), [
+        {"user_id": int(obj.user_id), "entity": ENTITY_NAMES[type(obj)], "entity_id": obj.id,
+         "deleted_at": now, "sync_version": versions[int(obj.user_id)]}
+        for obj in deleted
+    ])
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+from main import create_app, init_db  # noqa: E402
+from models import db  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path):
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+        EXPIRY_SCANNER_ENABLED = False
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        init_db()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
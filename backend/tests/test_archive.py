@@ -0,0 +1,49 @@
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.schema import CreateTable
+
+from archive import archive_foods
+from models import db, Food, FoodArchive, Tombstone
+from schema import init_schema
+
+
+def add_food(status="AVAILABLE"):
+    food = Food(user_id=1, name="Milk", category="Dairy", quantity=1, status=status, created_at=datetime.utcnow())
+    db.session.add(food)
+    db.session.commit()
+    return food.id
+
+
+def test_new_food_does_not_reuse_archived_id(app):
+    add_food()
+    archived_id = add_food(status="USED")
+
+    assert archive_foods(0) == 1
+
+    new_id = add_food(status="USED")
+    assert new_id > archived_id
+    # Archiving the new item must not collide with the archived row
+    assert archive_foods(0) == 1
+    assert {row.id for row in FoodArchive.query} == {archived_id, new_id}
+    assert {row.entity_id for row in Tombstone.query.filter_by(entity="food")} == {archived_id, new_id}
+
+
+def test_init_schema_rebuilds_food_table_without_autoincrement(app):
+    # A food table created before Food declared sqlite_autoincrement
+    ddl = str(CreateTable(Food.__table__).compile(dialect=db.engine.dialect)).replace(" AUTOINCREMENT", "")
+    with db.engine.begin() as connection:
+        connection.execute(text("DROP TABLE food"))
+        connection.execute(text(ddl))
+    add_food()
+    archived_id = add_food(status="USED")
+    assert archive_foods(0) == 1
+
+    init_schema()
+
+    with db.engine.connect() as connection:
+        sql = connection.execute(text("SELECT sql FROM sqlite_master WHERE name = 'food'")).scalar()
+    assert "AUTOINCREMENT" in sql
+    assert Food.query.count() == 1
+    assert add_food(status="USED") > archived_id
+    assert archive_foods(0) == 1
@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from cache import ResponseCache, history_version
+from models import db, Food, FoodArchive, Userlog, UserlogDaily
+from serializers import join_food
+
+LOG_ACTIONS = ["USED", "DONATED", "WASTED"]
+# Default number of buckets returned per granularity
+GRANULARITIES = {"day": 30, "week": 12, "month": 12}
+MAX_PERIODS = 366
+BUCKET_CACHE_SIZE = 10000
+
+# Closed buckets never change unless a past log is edited or deleted, or a
+# logged food is deleted or recategorized; each bumps the user's
+# history_version and so retires every cached entry
+bucket_cache = ResponseCache()
+
+
+def bucket_start(day, granularity):
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def shift_bucket(start, granularity, count):
+    """Start of the bucket `count` buckets after (or before) `start`."""
+    if granularity == "week":
+        return start + timedelta(weeks=count)
+    if granularity == "month":
+        month = start.year * 12 + start.month - 1 + count
+        return start.replace(year=month // 12, month=month % 12 + 1)
+    return start + timedelta(days=count)
+
+
+def _totals():
+    return {action.lower(): {"count": 0, "quantity": 0.0} for action in LOG_ACTIONS}
+
+
+def _empty_bucket(start, split):
+    bucket = {"period_start": start.isoformat(), **_totals()}
+    if split:
+        bucket["categories"] = {}
+    return bucket
+
+
+def _log_rows(user_id, start, end, split):
+    """Per-day totals from a range scan on (user_id, action_date)."""
+    columns = [Userlog.action_date, Userlog.action, func.count(Userlog.id),
+               func.coalesce(func.sum(Userlog.quantity), 0)]
+    group_by = [Userlog.action_date, Userlog.action]
+    if split:
+        category = func.coalesce(Food.category, FoodArchive.category, "Unknown")
+        columns.append(category)
+        group_by.append(category)
+    query = db.session.query(*columns)
+    if split:
+        query = join_food(query.select_from(Userlog), Userlog.food_id)
+    return (
+        query.filter(
+            Userlog.user_id == user_id,
+            Userlog.action_date >= start,
+            Userlog.action_date < end,
+            Userlog.action.in_(LOG_ACTIONS)
+        )
+        .group_by(*group_by)
+        .all()
+    )
+
+
+def _daily_rows(user_id, start, end, split):
+    """The same totals for compacted days, from UserlogDaily."""
+    columns = [UserlogDaily.day, UserlogDaily.action, func.sum(UserlogDaily.count),
+               func.sum(UserlogDaily.quantity)]
+    group_by = [UserlogDaily.day, UserlogDaily.action]
+    if split:
+        columns.append(UserlogDaily.category)
+        group_by.append(UserlogDaily.category)
+    return (
+        db.session.query(*columns)
+        .filter(
+            UserlogDaily.user_id == user_id,
+            UserlogDaily.day >= start,
+            UserlogDaily.day < end,
+            UserlogDaily.action.in_(LOG_ACTIONS)
+        )
+        .group_by(*group_by)
+        .all()
+    )
+
+
+def waste_trends(user_id, granularity="day", periods=None, split=False, today=None):
+    """USED/DONATED/WASTED counts and quantities per day, week or month.
+
+    Returns the last `periods` buckets, oldest first, ending with the one
+    containing today (UTC, matching Userlog.action_date). Closed buckets
+    are served from bucket_cache once computed, so a warm request only
+    scans the current bucket's logs. Days compacted by compaction.py are
+    read from UserlogDaily; a day is never in both tables.
+    """
+    user_id = int(user_id)
+    periods = periods or GRANULARITIES[granularity]
+    today = today or datetime.utcnow().date()
+    current = bucket_start(today, granularity)
+    starts = [shift_bucket(current, granularity, -offset) for offset in range(periods - 1, -1, -1)]
+
+    version = history_version(user_id)
+
+    def cache_key(start):
+        return (user_id, version, granularity, split, start)
+
+    buckets = {start: bucket_cache.get(cache_key(start)) for start in starts[:-1]}
+    missing = [start for start, bucket in buckets.items() if bucket is None]
+    scan_from = missing[0] if missing else current
+
+    fresh = {start: _empty_bucket(start, split) for start in starts if start >= scan_from}
+    end = shift_bucket(current, granularity, 1)
+    rows = _log_rows(user_id, scan_from, end, split) + _daily_rows(user_id, scan_from, end, split)
+    for row in rows:
+        action_date, action, count, quantity = row[:4]
+        bucket = fresh[bucket_start(action_date, granularity)]
+        targets = [bucket]
+        if split:
+            targets.append(bucket["categories"].setdefault(row[4], _totals()))
+        for target in targets:
+            target[action.lower()]["count"] += count
+            target[action.lower()]["quantity"] += quantity
+
+    for start, bucket in fresh.items():
+        if start != current:
+            bucket_cache.set(cache_key(start), bucket, BUCKET_CACHE_SIZE)
+        buckets[start] = bucket
+
+    return {
+        "granularity": granularity,
+        "periods": periods,
+        "split_by": "category" if split else None,
+        "series": [buckets[start] for start in starts]
+    }
@@ -1,6 +1,7 @@
 import { useEffect, useState } from "react";
 import { getAlerts } from "../services/alertService";
 import { updateFoodStatus } from "../services/foodService";
+import { subscribeToUpdates } from "../services/streamService";
 import "../styles/Alerts.css";
 
 const Alerts = () => {
@@ -41,6 +42,12 @@ const Alerts = () => {
     fetchAlerts();
   }, []);
 
+  // Refresh when the inventory changes elsewhere or an item crosses an expiry threshold
+  useEffect(() => {
+    const refresh = () => fetchAlerts();
+    return subscribeToUpdates({ inventory: refresh, expiry: refresh, reset: refresh });
+  }, []);
+
   const handleAction = async (id, action) => {
     let reason = null;
     if (action === "WASTED") {
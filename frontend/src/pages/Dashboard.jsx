@@ -1,6 +1,7 @@
 import { useEffect, useState } from "react";
 import { Link } from "react-router-dom";
 import { getInventory } from "../services/foodService";
+import { subscribeToUpdates } from "../services/streamService";
 import "../styles/Dashboard.css";
 
 const Dashboard = () => {
@@ -54,6 +55,12 @@ const Dashboard = () => {
     fetchData();
   }, []);
 
+  // Refresh when the inventory changes elsewhere or an item crosses an expiry threshold
+  useEffect(() => {
+    const refresh = () => fetchData();
+    return subscribeToUpdates({ inventory: refresh, expiry: refresh, reset: refresh });
+  }, []);
+
   return (
     <div className="dashboard">
       <div className="dashboard-header">
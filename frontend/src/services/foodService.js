@@ -19,18 +19,60 @@ export const addFoodItem = async (food) => {
   return res.data;
 };
 
-// Get all food items
+// Local copy of the user's food rows, kept current through /api/sync
+let replica = { token: null, cursor: null, items: new Map() };
+
+const DAY_MS = 24 * 60 * 60 * 1000;
+
+// Same rules as the server: EXPIRED before today, NEAR_EXPIRY 1-3 days
+// out, FRESH otherwise and null without an expiry date
+const withExpiryState = (item, today) => {
+  if (!item.expiry_date) return { ...item, expiry_state: null, days_left: null };
+  const daysLeft = Math.round((Date.parse(item.expiry_date) - today) / DAY_MS);
+  let expiryState = "FRESH";
+  if (daysLeft < 0) expiryState = "EXPIRED";
+  else if (daysLeft >= 1 && daysLeft <= 3) expiryState = "NEAR_EXPIRY";
+  return { ...item, expiry_state: expiryState, days_left: daysLeft };
+};
+
+// Orders items like the buckets of GET /api/food: available (near expiry
+// first), expired (longest expired first), then used, donated and wasted
+const inventoryList = (rows) => {
+  const now = new Date();
+  const today = Date.UTC(now.getFullYear(), now.getMonth(), now.getDate());
+  const items = rows.map((row) => withExpiryState(row, today));
+  const isAvailable = (item) => item.status === "AVAILABLE";
+
+  const available = items.filter((item) => isAvailable(item) && item.expiry_state !== "EXPIRED");
+  available.sort((a, b) =>
+    (a.expiry_state === "NEAR_EXPIRY" ? 0 : 1) - (b.expiry_state === "NEAR_EXPIRY" ? 0 : 1) ||
+    (a.days_left ?? 999) - (b.days_left ?? 999)
+  );
+  const expired = items.filter((item) => isAvailable(item) && item.expiry_state === "EXPIRED");
+  expired.sort((a, b) => a.days_left - b.days_left);
+  const withStatus = (status) => items.filter((item) => item.status === status);
+
+  return [...available, ...expired, ...withStatus("USED"), ...withStatus("DONATED"), ...withStatus("WASTED")];
+};
+
+// Get all food items; after the first call only changed rows are downloaded
 export const getInventory = async () => {
-  const res = await axios.get(`${API_URL}/food`, getHeaders());
-  const data = res.data || {};
-  const buckets = [
-    data.available_items,
-    data.expired_items,
-    data.used_items,
-    data.donated_items,
-    data.wasted_items,
-  ];
-  return buckets.flat().filter(Boolean);
+  const token = getToken();
+  if (replica.token !== token) {
+    replica = { token, cursor: null, items: new Map() };
+  }
+
+  const params = replica.cursor ? { since: replica.cursor } : {};
+  const res = await axios.get(`${API_URL}/sync`, { ...getHeaders(), params });
+  const { full, changes, deleted, cursor } = res.data;
+
+  if (full) replica.items = new Map();
+  // Deletions first: a new row may reuse a deleted row's id
+  deleted.food.forEach((id) => replica.items.delete(id));
+  changes.food.forEach((item) => replica.items.set(item.id, item));
+  replica.cursor = cursor;
+
+  return inventoryList([...replica.items.values()]);
 };
 
 // Update food item
@@ -0,0 +1,16 @@
+import { getToken } from "./authService";
+
+const API_URL = "https://smart-food-waste-management.up.railway.app/api/stream";
+
+// Subscribe to live updates. handlers maps event names ("inventory",
+// "expiry", "offer", "reset") to callbacks. Returns a function that closes
+// the stream.
+export const subscribeToUpdates = (handlers) => {
+  const source = new EventSource(`${API_URL}?jwt=${encodeURIComponent(getToken())}`);
+
+  Object.entries(handlers).forEach(([eventName, handler]) => {
+    source.addEventListener(eventName, (event) => handler(JSON.parse(event.data)));
+  });
+
+  return () => source.close();
+};